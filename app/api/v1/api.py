@@ -1,7 +1,7 @@
 # app/api/v1/api.py
 
 from fastapi import APIRouter
-from .endpoints import auth, claims, investigate
+from .endpoints import admin, analytics, auth, claims, entities, investigate
 
 api_router = APIRouter()
 
@@ -15,4 +15,16 @@ api_router.include_router(claims.router, prefix="/claims", tags=["Claims Managem
 
 # Include the investigation (chat) router
 # Routes like /{claim_id}/query will be available at /api/v1/investigate/{claim_id}/query
-api_router.include_router(investigate.router, prefix="/investigate", tags=["AI Investigation"])
\ No newline at end of file
+api_router.include_router(investigate.router, prefix="/investigate", tags=["AI Investigation"])
+
+# Include the cross-claim entity router
+# Routes like /lookup will be available at /api/v1/entities/lookup
+api_router.include_router(entities.router, prefix="/entities", tags=["Entity Index"])
+
+# Include the admin router
+# Routes like /usage will be available at /api/v1/admin/usage
+api_router.include_router(admin.router, prefix="/admin", tags=["Administration"])
+
+# Include the portfolio analytics router
+# Routes like /portfolio will be available at /api/v1/analytics/portfolio
+api_router.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
\ No newline at end of file
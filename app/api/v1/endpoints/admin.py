@@ -0,0 +1,54 @@
+# app/api/v1/endpoints/admin.py
+
+from fastapi import APIRouter, Depends, Query
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.core.security import get_current_admin_user
+from app.db.session import get_db_collection
+from app.models.usage import UsageReport
+from app.models.user import User
+
+router = APIRouter()
+
+@router.get("/usage", response_model=UsageReport)
+async def get_usage_report(
+    limit: int = Query(10, ge=1, le=100, description="Number of heaviest claims to return."),
+    claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Aggregates the Bedrock token and payload usage stored on each claim, per analyzer
+    and for the heaviest claims, so optimisation work can target the real hot spots.
+    """
+    unwind = [{"$match": {"token_usage.0": {"$exists": True}}}, {"$unwind": "$token_usage"}]
+
+    by_analyzer = await claims_collection.aggregate(unwind + [
+        {"$group": {
+            "_id": "$token_usage.analyzer",
+            "calls": {"$sum": 1},
+            "input_tokens": {"$sum": "$token_usage.input_tokens"},
+            "output_tokens": {"$sum": "$token_usage.output_tokens"},
+            "request_bytes": {"$sum": "$token_usage.request_bytes"},
+            "response_bytes": {"$sum": "$token_usage.response_bytes"},
+            "total_latency_ms": {"$sum": "$token_usage.latency_ms"},
+            "avg_latency_ms": {"$avg": "$token_usage.latency_ms"},
+        }},
+        {"$set": {"analyzer": "$_id"}},
+        {"$sort": {"input_tokens": -1}},
+    ]).to_list(length=None)
+
+    top_claims = await claims_collection.aggregate(unwind + [
+        {"$group": {
+            "_id": "$id",
+            "calls": {"$sum": 1},
+            "input_tokens": {"$sum": "$token_usage.input_tokens"},
+            "output_tokens": {"$sum": "$token_usage.output_tokens"},
+            "request_bytes": {"$sum": "$token_usage.request_bytes"},
+            "total_latency_ms": {"$sum": "$token_usage.latency_ms"},
+        }},
+        {"$set": {"claim_id": "$_id"}},
+        {"$sort": {"input_tokens": -1}},
+        {"$limit": limit},
+    ]).to_list(length=None)
+
+    return {"by_analyzer": by_analyzer, "top_claims": top_claims}
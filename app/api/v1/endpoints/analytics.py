@@ -0,0 +1,42 @@
+# app/api/v1/endpoints/analytics.py
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.core.security import get_current_active_user, get_current_admin_user
+from app.models.analytics import AnalyticsRebuild, AnalyticsRollup
+from app.models.user import User
+from app.services.analytics_service import PORTFOLIO_ID, adjuster_rollup_id, analytics_rollups
+
+router = APIRouter()
+
+@router.get("/portfolio", response_model=AnalyticsRollup)
+async def get_portfolio_analytics(current_user: User = Depends(get_current_admin_user)):
+    """
+    Risk score distribution, counts by status and turnaround across all claims.
+    Read from a precomputed rollup, so the cost does not grow with claim volume.
+    """
+    rollup = await analytics_rollups.get(PORTFOLIO_ID)
+    if rollup is None:
+        raise HTTPException(status_code=404, detail="No analytics rollups yet. Run POST /analytics/rebuild once.")
+    return rollup
+
+@router.get("/adjusters/{adjuster_id}", response_model=AnalyticsRollup)
+async def get_adjuster_analytics(adjuster_id: str, current_user: User = Depends(get_current_admin_user)):
+    rollup = await analytics_rollups.get(adjuster_rollup_id(adjuster_id))
+    if rollup is None:
+        raise HTTPException(status_code=404, detail="No analytics for this adjuster.")
+    return rollup
+
+@router.get("/me", response_model=AnalyticsRollup)
+async def get_my_analytics(current_user: User = Depends(get_current_active_user)):
+    rollup = await analytics_rollups.get(adjuster_rollup_id(current_user.id))
+    if rollup is None:
+        # First visit before any status change was rolled up: build just this adjuster's rollup.
+        await analytics_rollups.refresh({current_user.id})
+        rollup = await analytics_rollups.get(adjuster_rollup_id(current_user.id))
+    return rollup
+
+@router.post("/rebuild", response_model=AnalyticsRebuild)
+async def rebuild_analytics(current_user: User = Depends(get_current_admin_user)):
+    """Recomputes every rollup from the claims, e.g. after a data migration."""
+    return {"adjusters": await analytics_rollups.rebuild()}
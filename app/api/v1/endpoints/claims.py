@@ -1,90 +1,123 @@
 # app/api/v1/endpoints/claims.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.models.claim import Claim, ClaimCreate, ClaimCreateResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from app.models.claim import BulkClaimCreate, Claim, ClaimCreate, ClaimCreateResponse
+from app.crud import crud_claim
 from app.models.user import User
 from app.db.session import get_db_collection
-from app.services.aws_service import aws_service
 from app.core.security import get_current_active_user
-from app.services.analysis_service import analyze_claim_bundle
+from app.services.analytics_service import analytics_rollups
+from app.services.claim_analysis_service import analysis_runs
+from app.services.progress_service import progress_hub
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorCollection
 import uuid
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from app.core.config import settings
+from app.core.http_cache import make_etag, is_not_modified, not_modified_response, set_cache_headers
 import asyncio
+import json
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Claim])
-async def get_all_claims(claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")), current_user: User = Depends(get_current_active_user)):
+async def get_all_claims(request: Request, response: Response, claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")), current_user: User = Depends(get_current_active_user)):
+    # Version the list by its size and newest update, so polling clients get a cheap 304
+    # without the claims ever being loaded or serialized.
+    version = await claims_collection.aggregate([
+        {"$match": {"adjuster_id": current_user.id}},
+        {"$group": {"_id": None, "count": {"$sum": 1}, "last_updated": {"$max": "$updated_at"}}},
+    ]).to_list(length=1)
+    count, last_updated = (version[0]["count"], version[0]["last_updated"]) if version else (0, None)
+    etag = make_etag(current_user.id, count, last_updated)
+    if is_not_modified(request, etag, last_updated):
+        return not_modified_response(etag, last_updated)
+
     claims_cursor = claims_collection.find({"adjuster_id": current_user.id})
+    set_cache_headers(response, etag, last_updated)
     return await claims_cursor.to_list(length=1000)
 
 @router.post("/", response_model=ClaimCreateResponse, status_code=status.HTTP_201_CREATED)
 async def create_claim(claim_in: ClaimCreate, claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")), current_user: User = Depends(get_current_active_user)):
     new_claim_id = str(uuid.uuid4())
-    upload_urls, s3_keys = [], []
-    for i in range(claim_in.file_count):
-        object_name = f"claims/{new_claim_id}/file_{uuid.uuid4().hex}"
-        s3_keys.append(object_name)
-        presigned_data = aws_service.generate_presigned_post_url(object_name)
-        if not presigned_data:
-            raise HTTPException(status_code=500, detail="Could not generate S3 upload URL.")
-        upload_urls.append(presigned_data)
-    claim_data = {"id": new_claim_id, "adjuster_id": current_user.id, "status": "upload_in_progress", "file_count": claim_in.file_count, "additional_info": claim_in.additional_info, "created_at": datetime.utcnow(), "updated_at": datetime.utcnow(), "s3_keys": s3_keys}
+    s3_keys = crud_claim.new_s3_keys(new_claim_id, claim_in.file_count)
+    upload_urls = crud_claim.presign_upload_targets(s3_keys)
+    if upload_urls is None:
+        raise HTTPException(status_code=500, detail="Could not generate S3 upload URL.")
+    claim_data = {"id": new_claim_id, "adjuster_id": current_user.id, "status": "upload_in_progress", "file_count": claim_in.file_count, "additional_info": claim_in.additional_info, "incident_date": claim_in.incident_date, "created_at": datetime.utcnow(), "updated_at": datetime.utcnow(), "s3_keys": s3_keys}
     await claims_collection.insert_one(claim_data)
+    analytics_rollups.mark_dirty(current_user.id)
     return {"claim_id": new_claim_id, "upload_urls": upload_urls}
 
+@router.post("/bulk", status_code=status.HTTP_200_OK)
+async def bulk_create_claims(bulk_in: BulkClaimCreate, claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")), current_user: User = Depends(get_current_active_user)):
+    """
+    Creates many claims in one request. Results are streamed back as newline-delimited
+    JSON, one line per item (created, existing or failed) followed by a summary line.
+    """
+    async def results():
+        try:
+            async for result in crud_claim.bulk_create_claims(claims_collection, current_user.id, bulk_in.items):
+                yield json.dumps(result) + "\n"
+        finally:
+            # Also when the client disconnects mid-stream: the claims created so far count.
+            analytics_rollups.mark_dirty(current_user.id)
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 @router.post("/{claim_id}/trigger-analysis", response_model=Claim, status_code=status.HTTP_202_ACCEPTED)
-async def trigger_claim_analysis(claim_id: str, claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")), current_user: User = Depends(get_current_active_user)):
-    claim = await claims_collection.find_one({"id": claim_id, "adjuster_id": current_user.id})
+async def trigger_claim_analysis(claim_id: str, full_synthesis: bool = False, idempotency_key: Optional[str] = Header(None, max_length=200), claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")), current_user: User = Depends(get_current_active_user)):
+    """
+    Analyses the claim. Only one analysis of a claim runs at a time: a trigger that
+    arrives while one is in flight waits for it and returns its result. Sending an
+    Idempotency-Key header makes a retry of a completed request return the stored
+    result instead of analysing the claim again.
+    """
+    claim = await analysis_runs.trigger(claims_collection, claim_id, current_user.id, full_synthesis, idempotency_key)
     if not claim:
         raise HTTPException(status_code=404, detail="Claim not found")
+    return claim
 
-    await claims_collection.update_one({"id": claim_id}, {"$set": {"status": "analyzing"}})
-    
-    texts_for_analysis, images_for_analysis = [], []
-    s3_keys_to_process = claim.get("s3_keys", [])
+@router.get("/{claim_id}", response_model=Claim)
+async def get_claim(claim_id: str, request: Request, response: Response, claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")), current_user: User = Depends(get_current_active_user)):
+    claim = await claims_collection.find_one({"id": claim_id, "adjuster_id": current_user.id})
+    if not claim:
+        raise HTTPException(status_code=404, detail="Claim not found.")
+    etag = make_etag(claim_id, claim.get("updated_at"))
+    if is_not_modified(request, etag, claim.get("updated_at")):
+        return not_modified_response(etag, claim.get("updated_at"))
+    set_cache_headers(response, etag, claim.get("updated_at"))
+    return claim
 
-    for s3_key in s3_keys_to_process:
-        original_filename = s3_key.split('/')[-1]
-        file_extension = s3_key.split('.')[-1].lower()
-        is_image = file_extension in ['jpg', 'jpeg', 'png']
-        
-        try:
-            text = aws_service.extract_text_from_file_with_bedrock(s3_key)
-            texts_for_analysis.append(text)
-            if is_image:
-                forensics = aws_service.analyze_image_forensics(s3_key)
-                reverse_search = aws_service.reverse_image_search(s3_key)
-                metadata = aws_service.extract_image_metadata(s3_key)
-                images_for_analysis.append({"filename": original_filename, "results": forensics, "reverse_search": reverse_search, "metadata": metadata})
-        except Exception as e:
-            texts_for_analysis.append(f"Analysis failed for file {original_filename}: {e}")
+@router.get("/{claim_id}/events")
+async def stream_claim_progress(claim_id: str, request: Request, claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")), current_user: User = Depends(get_current_active_user)):
+    """
+    Server-Sent Events stream of claim- and document-level status changes. The
+    current state is sent first, followed by every change as it happens.
+    """
+    claim = await claims_collection.find_one({"id": claim_id, "adjuster_id": current_user.id}, {"_id": 1})
+    if not claim:
+        raise HTTPException(status_code=404, detail="Claim not found.")
 
-    adjuster_notes = claim.get('additional_info')
-    final_report = await analyze_claim_bundle(texts_for_analysis, images_for_analysis, [], adjuster_notes)
+    # Subscribe before taking the snapshot so no change can slip in between.
+    queue = progress_hub.subscribe(claim_id)
 
-    update_data = {"summary": final_report.get("summary"), "fraud_risk_score": final_report.get("fraud_risk_score"), "key_risk_factors": final_report.get("key_risk_factors"), "status": "ready_for_review", "updated_at": datetime.utcnow()}
-    await claims_collection.update_one({"id": claim_id}, {"$set": update_data})
-    
-    context_content = f"Claim ID: {claim_id}\nFraud Risk Score: {final_report.get('fraud_risk_score')}%\nSummary: {final_report.get('summary')}\n\nKey Risk Factors:\n"
-    for factor in final_report.get('key_risk_factors', []):
-        context_content += f"- {factor}\n"
-    context_content += "\n--- Full Extracted Text ---\n" + "\n".join(texts_for_analysis)
-    context_s3_key = f"claims_context/{claim_id}.txt"
-    try:
-        aws_service.s3_client.put_object(Bucket=settings.Q_DATASOURCE_BUCKET_NAME, Key=context_s3_key, Body=context_content.encode('utf-8'))
-    except Exception as e:
-        print(f"ERROR: Could not upload context file for Amazon Q. Reason: {e}")
+    def format_event(event: dict) -> str:
+        return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
 
-    updated_claim = await claims_collection.find_one({"id": claim_id})
-    return updated_claim
+    async def event_stream():
+        try:
+            for event in await progress_hub.snapshot(claim_id):
+                yield format_event(event)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.PROGRESS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            progress_hub.unsubscribe(claim_id, queue)
 
-@router.get("/{claim_id}", response_model=Claim)
-async def get_claim(claim_id: str, claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")), current_user: User = Depends(get_current_active_user)):
-    claim = await claims_collection.find_one({"id": claim_id, "adjuster_id": current_user.id})
-    if not claim:
-        raise HTTPException(status_code=404, detail="Claim not found.")
-    return claim
\ No newline at end of file
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,59 @@
+# app/api/v1/endpoints/entities.py
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from motor.motor_asyncio import AsyncIOMotorCollection
+from typing import List
+
+from app.core.security import get_current_active_user
+from app.db.session import get_db_collection
+from app.models.entity import EntityLink, EntityLookup
+from app.models.user import User
+from app.services.entity_service import ENTITY_TYPES, entity_key, find_linked_claims
+
+router = APIRouter()
+
+@router.get("/lookup", response_model=EntityLookup)
+async def lookup_entity(
+    entity_type: str = Query(..., description=f"One of: {', '.join(ENTITY_TYPES)}"),
+    value: str = Query(..., description="Raw value, e.g. a licence plate as printed."),
+    limit: int = Query(100, ge=1, le=1000),
+    claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")),
+    entity_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("entity_index")),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Returns the adjuster's own claims a licence plate, device, GPS position or
+    online image URL has been seen in. Other adjusters' claims are not listed;
+    cross-claim links are reported per claim by `/claims/{claim_id}/links`.
+    """
+    if entity_type not in ENTITY_TYPES:
+        raise HTTPException(status_code=400, detail=f"entity_type must be one of: {', '.join(ENTITY_TYPES)}")
+    key = entity_key(entity_type, value)
+    if key is None:
+        raise HTTPException(status_code=400, detail="Value could not be normalized for this entity type.")
+
+    entry = await entity_collection.find_one({"_id": key})
+    own = set()
+    if entry:
+        cursor = claims_collection.find({"id": {"$in": entry.get("claim_ids", [])}, "adjuster_id": current_user.id}, {"id": 1})
+        own = {claim["id"] for claim in await cursor.to_list(length=None)}
+    if not own:
+        raise HTTPException(status_code=404, detail="Entity has not been seen in any of your claims.")
+    claim_ids = [claim_id for claim_id in entry["claim_ids"] if claim_id in own]
+    return {"entity": key, "type": entry["type"], "value": entry["value"], "claim_count": len(claim_ids), "claim_ids": claim_ids[:limit]}
+
+
+@router.get("/claims/{claim_id}/links", response_model=List[EntityLink])
+async def get_claim_links(
+    claim_id: str,
+    claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")),
+    entity_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("entity_index")),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Lists the other claims sharing a plate, device, location or online image with this claim.
+    """
+    claim = await claims_collection.find_one({"id": claim_id, "adjuster_id": current_user.id}, {"entity_keys": 1})
+    if not claim:
+        raise HTTPException(status_code=404, detail="Claim not found.")
+    return await find_linked_claims(entity_collection, claim_id, claim.get("entity_keys", []))
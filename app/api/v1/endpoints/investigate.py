@@ -4,7 +4,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from app.models.user import User
 from app.core.security import get_current_active_user
+from app.db.session import get_db_collection
 from app.services.aws_service import aws_service
+from app.services.retrieval_service import format_query_with_passages, index_store, search
+from app.core.config import settings
+from motor.motor_asyncio import AsyncIOMotorCollection
 import asyncio
 
 router = APIRouter()
@@ -23,15 +27,25 @@ class QueryResponse(BaseModel):
     answer: str
     systemMessageId: str # <-- This was already correct
 
+async def _ensure_own_claim(claims_collection: AsyncIOMotorCollection, claim_id: str, current_user: User):
+    # The retrieval index holds the claim's extracted text, so only its adjuster may query it.
+    claim = await claims_collection.find_one({"id": claim_id, "adjuster_id": current_user.id}, {"_id": 1})
+    if not claim:
+        raise HTTPException(status_code=404, detail="Claim not found.")
+
 @router.post("/{claim_id}/start-conversation", response_model=StartConversationResponse)
-async def start_conversation(claim_id: str, current_user: User = Depends(get_current_active_user)):
+async def start_conversation(claim_id: str, claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")), current_user: User = Depends(get_current_active_user)):
     """
     Starts a new conversation with Amazon Q, seeded with the claim's context.
     """
+    await _ensure_own_claim(claims_collection, claim_id, current_user)
     try:
         # We use asyncio.to_thread to run the synchronous boto3 call in a separate thread
         # without blocking the FastAPI event loop.
-        response = await asyncio.to_thread(aws_service.start_q_conversation_with_context, claim_id=claim_id)
+        # With a retrieval index only the case summary seeds the conversation; the
+        # relevant passages travel with each question instead of the whole case file.
+        index = await asyncio.to_thread(index_store.load, claim_id)
+        response = await asyncio.to_thread(aws_service.start_q_conversation_with_context, claim_id=claim_id, include_full_text=index is None)
         return response
     except Exception as e:
         if isinstance(e, HTTPException):
@@ -40,16 +54,22 @@ async def start_conversation(claim_id: str, current_user: User = Depends(get_cur
         raise HTTPException(status_code=503, detail=f"The AI co-pilot is currently unavailable. Error: {e}")
 
 @router.post("/{claim_id}/query", response_model=QueryResponse)
-async def query_conversation(claim_id: str, request: QueryRequest, current_user: User = Depends(get_current_active_user)):
+async def query_conversation(claim_id: str, request: QueryRequest, claims_collection: AsyncIOMotorCollection = Depends(lambda: get_db_collection("claims")), current_user: User = Depends(get_current_active_user)):
     """
     Sends a follow-up query to an existing Amazon Q conversation.
     """
+    await _ensure_own_claim(claims_collection, claim_id, current_user)
     try:
+        query = request.query
+        index = await asyncio.to_thread(index_store.load, claim_id)
+        if index is not None:
+            passages = search(index, request.query, settings.RETRIEVAL_TOP_K)
+            query = format_query_with_passages(request.query, passages)
         ai_response = await asyncio.to_thread(
             aws_service.query_q_conversation,
             conversation_id=request.conversationId,
             parent_message_id=request.parentMessageId, # <-- Pass the parent ID to the service
-            query=request.query
+            query=query
         )
         return ai_response
     except Exception as e:
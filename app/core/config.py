@@ -1,8 +1,9 @@
 # app/core/config.py
 
 import os
-from typing import Optional
+from typing import List, Optional
 from dotenv import load_dotenv
+from pydantic import Field
 from pydantic_settings import BaseSettings # <-- THIS LINE IS CHANGED
 
 load_dotenv()
@@ -11,28 +12,120 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Veritas AI"
     API_V1_STR: str = "/api/v1"
 
+    # Responses smaller than this many bytes are sent uncompressed.
+    GZIP_MINIMUM_SIZE: int = 1024
+
     # Security
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # Users with these emails are administrators, in addition to users whose
+    # record has `is_admin` set. This is how the first administrator is made.
+    ADMIN_EMAILS: List[str] = []
 
     # MongoDB
     MONGO_CONNECTION_STRING: str
     MONGO_DB_NAME: str
+    # Pool sizes are per process: the API's async client and the Lambdas' sync client.
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_SYNC_MAX_POOL_SIZE: int = 10
+    MONGO_MAX_IDLE_TIME_MS: int = 60000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 10000
+    READINESS_TIMEOUT_SECONDS: float = 2.0
 
     # AWS
     AWS_ACCESS_KEY_ID: str
     AWS_SECRET_ACCESS_KEY: str
     AWS_REGION: str
     S3_UPLOADS_BUCKET_NAME: str
+    # Shared by every client; Bedrock responses can take well over a minute.
+    AWS_MAX_POOL_CONNECTIONS: int = 50
+    AWS_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    AWS_READ_TIMEOUT_SECONDS: float = 180.0
+    AWS_MAX_ATTEMPTS: int = 3
     
     # AI Services
     BEDROCK_MODEL_ID: str
+    # Backup model IDs or inference profiles for synthesis, tried in order (JSON list).
+    # A backup is fired when the current call has not produced a valid report after
+    # BEDROCK_HEDGE_AFTER_SECONDS (unset disables hedging), or as soon as it fails.
+    BEDROCK_FALLBACK_MODEL_IDS: List[str] = []
+    BEDROCK_HEDGE_AFTER_SECONDS: Optional[float] = 20.0
+    # Follow-up calls asking the model to fix a report that is not valid JSON.
+    BEDROCK_REPAIR_ATTEMPTS: int = 1
     AMAZON_Q_APP_ID: str
     AMAZON_Q_USER_ID_PREFIX: str
 
+    # Large file payloads: request bodies are built in spooled temp files that
+    # move to disk past PAYLOAD_SPOOL_MAX_BYTES, and payloads in flight at once
+    # are capped at PAYLOAD_MEMORY_BUDGET_BYTES per process. Files are encoded in
+    # chunks of whole 3-byte base64 groups, so a chunk is at least 3 bytes.
+    PAYLOAD_MEMORY_BUDGET_BYTES: int = 256 * 1024 * 1024
+    PAYLOAD_SPOOL_MAX_BYTES: int = 8 * 1024 * 1024
+    PAYLOAD_CHUNK_BYTES: int = Field(768 * 1024, ge=3)
+    # EXIF lives at the start of JPEGs, so only this much is fetched for metadata.
+    EXIF_HEADER_BYTES: int = 128 * 1024
+
+    # Pre-screening: a local rules + logistic model score computed before synthesis.
+    # Claims scoring below PRESCREEN_SKIP_SYNTHESIS_BELOW (off when unset) skip Bedrock.
+    PRESCREEN_MODEL_PATH: Optional[str] = None
+    PRESCREEN_RULES_PATH: Optional[str] = None
+    PRESCREEN_LOW_RISK_BELOW: int = 20
+    PRESCREEN_HIGH_RISK_FROM: int = 60
+    PRESCREEN_SKIP_SYNTHESIS_BELOW: Optional[int] = None
+    # Concurrent Bedrock synthesis calls per process; waiting claims go highest risk first.
+    SYNTHESIS_CONCURRENCY: int = 8
+
+    # Single-flight trigger-analysis: a run holds a lease on the claim, renewed while
+    # it runs; concurrent triggers in other processes poll for its result.
+    ANALYSIS_LEASE_SECONDS: int = 600
+    ANALYSIS_ATTACH_POLL_SECONDS: float = 1.0
+
+    # Bulk claim ingestion
+    BULK_BATCH_SIZE: int = 500
+    BULK_PRESIGN_CONCURRENCY: int = 16
+
+    # Live claim progress (change streams, with polling on standalone servers)
+    PROGRESS_POLL_INTERVAL_SECONDS: float = 2.0
+    PROGRESS_HEARTBEAT_SECONDS: float = 15.0
+    PROGRESS_QUEUE_SIZE: int = 100
+
+    # Co-pilot retrieval index (BM25 over extracted claim text)
+    RETRIEVAL_CHUNK_WORDS: int = 180
+    RETRIEVAL_CHUNK_OVERLAP: int = 30
+    RETRIEVAL_TOP_K: int = 4
+    RETRIEVAL_CACHE_SIZE: int = 64
+    RETRIEVAL_CACHE_TTL_SECONDS: float = 300.0
+
+    # Blob store: document fields (extracted text, analysis results) larger than
+    # this are kept gzipped in S3 with only a reference and digest in MongoDB.
+    BLOB_INLINE_MAX_BYTES: int = 16384
+    BLOB_CACHE_SIZE: int = 128
+    # Unreferenced blobs are only deleted once they are this old, so a blob whose
+    # reference is still being written by a concurrent run is never pruned.
+    BLOB_PRUNE_GRACE_SECONDS: int = 3600
+
+    # Portfolio analytics rollups are rebuilt this long after a claim status
+    # change, so a burst of changes costs one recomputation per adjuster.
+    ANALYTICS_DEBOUNCE_SECONDS: float = 5.0
+
+    # Cross-claim entity index: entities shared by more claims than this are
+    # too common (e.g. a popular phone model) to be reported as links.
+    ENTITY_COMMON_THRESHOLD: int = 50
+
     # Google Reverse Image Search
     GOOGLE_API_KEY: Optional[str] = None
     GOOGLE_CUSTOM_SEARCH_ENGINE_ID: Optional[str] = None
+    # Searches run from the enrichment queue (enrichment_worker.py), within these
+    # budgets shared by all workers; results are cached per image hash.
+    REVERSE_SEARCH_DAILY_QUOTA: int = 100
+    REVERSE_SEARCH_PER_MINUTE_QUOTA: int = 10
+    REVERSE_SEARCH_CACHE_TTL_DAYS: int = 30
+    ENRICHMENT_POLL_INTERVAL_SECONDS: float = 2.0
+    ENRICHMENT_LEASE_SECONDS: int = 120
+    ENRICHMENT_MAX_ATTEMPTS: int = 3
 
     # AWS Rekognition Video
     REKOGNITION_SNS_TOPIC_ARN: str
@@ -0,0 +1,343 @@
+# app/core/metrics.py
+
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# --- Metric Definitions ---
+# Every instrumented call is labelled with the component it belongs to
+# ("aws", "mongo", "bedrock", "http") and the operation name within it.
+#
+# Under gunicorn each worker process keeps its own values in
+# PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py) and /metrics merges them.
+# Gauges are summed over the live workers only, so a recycled worker's last
+# in-flight count or pool size does not linger.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+OPERATION_LATENCY = Histogram(
+    "veritas_operation_latency_seconds",
+    "Latency of instrumented operations.",
+    ["component", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+OPERATIONS_IN_FLIGHT = Gauge(
+    "veritas_operations_in_flight",
+    "Number of instrumented operations currently running.",
+    ["component", "operation"],
+    multiprocess_mode="livesum",
+)
+OPERATION_ERRORS = Counter(
+    "veritas_operation_errors_total",
+    "Number of instrumented operations that raised an exception.",
+    ["component", "operation", "error"],
+)
+CLAIM_STAGE_LATENCY = Histogram(
+    "veritas_claim_stage_latency_seconds",
+    "Time spent in each stage of the claim analysis pipeline.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+BEDROCK_TOKENS = Counter(
+    "veritas_bedrock_tokens_total",
+    "Bedrock tokens consumed, by analyzer and direction.",
+    ["analyzer", "direction"],
+)
+BEDROCK_PAYLOAD_BYTES = Counter(
+    "veritas_bedrock_payload_bytes_total",
+    "Bytes sent to and received from Bedrock, by analyzer and direction.",
+    ["analyzer", "direction"],
+)
+BEDROCK_HEDGES = Counter(
+    "veritas_bedrock_hedges_total",
+    "Backup synthesis requests, by what fired them (latency or failure) and whether they won.",
+    ["trigger", "won"],
+)
+BEDROCK_REPAIRS = Counter(
+    "veritas_bedrock_repairs_total",
+    "Repair retries for malformed synthesis reports, by outcome.",
+    ["outcome"],
+)
+PAYLOAD_MEMORY_RESERVED = Gauge(
+    "veritas_payload_memory_reserved_bytes",
+    "Bytes currently reserved from the per-process payload memory budget.",
+    multiprocess_mode="livesum",
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "veritas_mongo_pool_connections",
+    "Mongo connection pool usage, by client and state (open, in_use, waiting).",
+    ["client", "state"],
+    multiprocess_mode="livesum",
+)
+
+
+def record(component: str, operation: str, seconds: float, error: Optional[str] = None):
+    """Records a single completed operation whose labels are only known afterwards."""
+    OPERATION_LATENCY.labels(component, operation).observe(seconds)
+    if error is not None:
+        OPERATION_ERRORS.labels(component, operation, error).inc()
+
+
+def record_bedrock_usage(usage: Dict) -> None:
+    """Feeds a Bedrock usage record (see AWSService._invoke_bedrock) into the counters."""
+    analyzer = usage["analyzer"]
+    BEDROCK_TOKENS.labels(analyzer, "input").inc(usage["input_tokens"])
+    BEDROCK_TOKENS.labels(analyzer, "output").inc(usage["output_tokens"])
+    BEDROCK_PAYLOAD_BYTES.labels(analyzer, "request").inc(usage["request_bytes"])
+    BEDROCK_PAYLOAD_BYTES.labels(analyzer, "response").inc(usage["response_bytes"])
+
+
+def _observe(component: str, operation: str, started: float, error: Optional[BaseException] = None):
+    record(component, operation, time.perf_counter() - started, type(error).__name__ if error is not None else None)
+
+
+@contextmanager
+def track(component: str, operation: str):
+    """Records latency, in-flight count and errors for the wrapped block."""
+    in_flight = OPERATIONS_IN_FLIGHT.labels(component, operation)
+    in_flight.inc()
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        _observe(component, operation, started, e)
+        raise
+    else:
+        _observe(component, operation, started)
+    finally:
+        in_flight.dec()
+
+
+def instrument(component: str, operation: Optional[str] = None):
+    """
+    Decorator form of `track`. Works for both regular and async functions;
+    the operation name defaults to the function name.
+    """
+    def decorator(func):
+        name = operation or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track(component, name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(component, name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# --- Mongo Instrumentation ---
+
+MONGO_OPERATIONS = {
+    "find_one", "find_one_and_update", "find_one_and_replace", "find_one_and_delete",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "count_documents", "distinct", "bulk_write", "create_index",
+}
+
+# Operations returning a cursor; they are recorded once the cursor is consumed.
+MONGO_CURSOR_OPERATIONS = {"find", "aggregate"}
+
+
+class InstrumentedCollection:
+    """
+    Thin proxy around a Motor or PyMongo collection that records metrics for
+    the common CRUD operations and the cursors of `find` and `aggregate`.
+    Anything else is passed straight through.
+
+    Only collections handed out by `get_db_collection` are wrapped. The Lambda
+    handlers use `registry.sync_database()` directly: a Lambda has no scrape
+    endpoint, so their Mongo time shows up in the function's CloudWatch duration
+    instead.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._collection, name)
+        if name in MONGO_CURSOR_OPERATIONS:
+            return _cursor_factory(attr, f"{self._collection.name}.{name}")
+        if name not in MONGO_OPERATIONS:
+            return attr
+
+        operation = f"{self._collection.name}.{name}"
+
+        @functools.wraps(attr)
+        def wrapper(*args, **kwargs):
+            in_flight = OPERATIONS_IN_FLIGHT.labels("mongo", operation)
+            in_flight.inc()
+            started = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except BaseException as e:
+                in_flight.dec()
+                _observe("mongo", operation, started, e)
+                raise
+            if not inspect.isawaitable(result):
+                in_flight.dec()
+                _observe("mongo", operation, started)
+                return result
+            return _await_and_observe(result, operation, started)
+
+        return wrapper
+
+
+async def _await_and_observe(awaitable, operation: str, started: float):
+    try:
+        result = await awaitable
+    except BaseException as e:
+        _observe("mongo", operation, started, e)
+        raise
+    else:
+        _observe("mongo", operation, started)
+        return result
+    finally:
+        OPERATIONS_IN_FLIGHT.labels("mongo", operation).dec()
+
+
+def _cursor_factory(method, operation: str):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        cursor = InstrumentedCursor(None, operation)
+        # PyMongo runs `aggregate` right away; Motor and `find` only build the cursor.
+        with cursor._fetching():
+            cursor._cursor = method(*args, **kwargs)
+        return cursor
+    return wrapper
+
+
+class InstrumentedCursor:
+    """
+    Proxy around a Motor or PyMongo cursor. Only the time spent waiting for
+    results is counted, not the caller's work between documents, and it is
+    recorded as one operation once the cursor is exhausted (by `to_list` or
+    iteration) or fails. A cursor abandoned half-way is not recorded.
+    """
+
+    def __init__(self, cursor, operation: str):
+        self._cursor = cursor
+        self._operation = operation
+        self._elapsed = 0.0
+        self._iterator = None
+        self._recorded = False
+
+    @contextmanager
+    def _fetching(self):
+        in_flight = OPERATIONS_IN_FLIGHT.labels("mongo", self._operation)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            yield
+        except (StopIteration, StopAsyncIteration):
+            self._elapsed += time.perf_counter() - started
+            self._record()
+            raise
+        except BaseException as e:
+            self._elapsed += time.perf_counter() - started
+            self._record(e)
+            raise
+        else:
+            self._elapsed += time.perf_counter() - started
+        finally:
+            in_flight.dec()
+
+    def _record(self, error: Optional[BaseException] = None) -> None:
+        if not self._recorded:
+            self._recorded = True
+            record("mongo", self._operation, self._elapsed, type(error).__name__ if error is not None else None)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def wrapper(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            # Chained modifiers (sort, limit, ...) return the cursor itself.
+            return self if result is self._cursor else result
+        return wrapper
+
+    def to_list(self, *args, **kwargs):
+        # Without a length, to_list drains the cursor.
+        drains = kwargs.get("length", args[0] if args else None) is None
+        with self._fetching():
+            result = self._cursor.to_list(*args, **kwargs)
+        if not inspect.isawaitable(result):
+            self._record_if_exhausted(drains)
+            return result
+        return self._await_list(result, drains)
+
+    async def _await_list(self, awaitable, drains: bool):
+        with self._fetching():
+            result = await awaitable
+        self._record_if_exhausted(drains)
+        return result
+
+    def _record_if_exhausted(self, drained: bool) -> None:
+        if drained or not getattr(self._cursor, "alive", True):
+            self._record()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._iterator is None:
+            self._iterator = self._cursor.__aiter__()
+        with self._fetching():
+            return await self._iterator.__anext__()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._iterator is None:
+            self._iterator = iter(self._cursor)
+        with self._fetching():
+            return next(self._iterator)
+
+
+# --- Per-Claim Stage Timing ---
+
+class StageTimer:
+    """
+    Collects a wall-clock breakdown (in milliseconds) of the stages a claim
+    goes through, so it can be stored alongside the claim.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            CLAIM_STAGE_LATENCY.labels(name).observe(elapsed)
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed * 1000, 2)
+
+
+def render_latest() -> tuple:
+    """
+    Returns the Prometheus exposition payload and its content type. With several
+    worker processes, every worker's values are merged so any worker can answer
+    a scrape with the totals.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,207 @@
+# app/core/resources.py
+
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+
+import boto3
+from botocore.client import BaseClient, Config
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.database import Database
+from pymongo.monitoring import ConnectionPoolListener
+
+from app.core.config import settings
+from app.core.metrics import MONGO_POOL_CONNECTIONS
+
+
+class MongoPoolStats(ConnectionPoolListener):
+    """Tracks connection pool usage for one Mongo client, across all of its server pools."""
+
+    def __init__(self, client_name: str):
+        self.client_name = client_name
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+        self._lock = threading.Lock()
+
+    def _update(self, opened: int = 0, in_use: int = 0, waiting: int = 0, failed: int = 0) -> None:
+        with self._lock:
+            self.open += opened
+            self.in_use += in_use
+            self.waiting += waiting
+            self.checkout_failures += failed
+            for state in ("open", "in_use", "waiting"):
+                MONGO_POOL_CONNECTIONS.labels(self.client_name, state).set(getattr(self, state))
+
+    def connection_created(self, event):
+        self._update(opened=1)
+
+    def connection_closed(self, event):
+        self._update(opened=-1)
+
+    def connection_check_out_started(self, event):
+        self._update(waiting=1)
+
+    def connection_checked_out(self, event):
+        self._update(waiting=-1, in_use=1)
+
+    def connection_check_out_failed(self, event):
+        self._update(waiting=-1, failed=1)
+
+    def connection_checked_in(self, event):
+        self._update(in_use=-1)
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self, max_pool_size: int) -> Dict[str, Any]:
+        return {
+            "open": self.open,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "max_pool_size": max_pool_size,
+            "utilisation": round(self.in_use / max_pool_size, 3) if max_pool_size else None,
+            "checkout_failures": self.checkout_failures,
+        }
+
+
+class ResourceRegistry:
+    """
+    Owns the process-wide connection pools: one async Mongo client for the API,
+    one sync Mongo client for the Lambda handlers and one set of AWS clients
+    sharing a single tuned configuration. Everything is created on first use,
+    so each gunicorn worker and Lambda container builds its own pools after
+    start-up; the API opens and closes them from the app lifespan.
+    """
+
+    def __init__(self):
+        self._mongo: Optional[AsyncIOMotorClient] = None
+        self._sync_mongo: Optional[MongoClient] = None
+        self._aws_clients: Dict[str, BaseClient] = {}
+        self._boto_session: Optional[boto3.Session] = None
+        self._lock = threading.Lock()
+        self.mongo_pool = MongoPoolStats("async")
+        self.sync_mongo_pool = MongoPoolStats("sync")
+
+    # --- MongoDB ---
+
+    @staticmethod
+    def _mongo_options(max_pool_size: int, listener: MongoPoolStats) -> Dict[str, Any]:
+        return {
+            "maxPoolSize": max_pool_size,
+            "minPoolSize": min(settings.MONGO_MIN_POOL_SIZE, max_pool_size),
+            "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+            "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "event_listeners": [listener],
+        }
+
+    @property
+    def mongo(self) -> AsyncIOMotorClient:
+        if self._mongo is None:
+            self._mongo = AsyncIOMotorClient(settings.MONGO_CONNECTION_STRING, **self._mongo_options(settings.MONGO_MAX_POOL_SIZE, self.mongo_pool))
+        return self._mongo
+
+    @mongo.setter
+    def mongo(self, client: AsyncIOMotorClient) -> None:
+        # Lets benchmarks and tools substitute a stand-in client.
+        self._mongo = client
+
+    def sync_database(self) -> Database:
+        """The blocking driver, for the Lambda handlers only; the API never uses it."""
+        with self._lock:
+            if self._sync_mongo is None:
+                self._sync_mongo = MongoClient(settings.MONGO_CONNECTION_STRING, **self._mongo_options(settings.MONGO_SYNC_MAX_POOL_SIZE, self.sync_mongo_pool))
+        return self._sync_mongo[settings.MONGO_DB_NAME]
+
+    # --- AWS ---
+
+    def aws_client(self, service_name: str, **config_overrides) -> BaseClient:
+        """
+        Returns the shared client for an AWS service. Clients are thread-safe once
+        built, but building them is not, hence the lock.
+        """
+        with self._lock:
+            client = self._aws_clients.get(service_name)
+            if client is None:
+                if self._boto_session is None:
+                    self._boto_session = boto3.Session(region_name=settings.AWS_REGION)
+                config = Config(
+                    max_pool_connections=settings.AWS_MAX_POOL_CONNECTIONS,
+                    connect_timeout=settings.AWS_CONNECT_TIMEOUT_SECONDS,
+                    read_timeout=settings.AWS_READ_TIMEOUT_SECONDS,
+                    retries={"max_attempts": settings.AWS_MAX_ATTEMPTS, "mode": "standard"},
+                    tcp_keepalive=True,
+                    **config_overrides,
+                )
+                client = self._boto_session.client(service_name, config=config)
+                self._aws_clients[service_name] = client
+            return client
+
+    @staticmethod
+    def _aws_pool_snapshot(client: BaseClient) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"max_pool_connections": client.meta.config.max_pool_connections}
+        try:
+            # botocore does not expose its urllib3 pools publicly; report them when reachable.
+            pools = client._endpoint.http_session._manager.pools
+            connection_pools = [pools[key] for key in pools.keys()]
+            stats["open"] = sum(pool.num_connections for pool in connection_pools)
+            stats["idle"] = sum(pool.pool.qsize() for pool in connection_pools if pool.pool is not None)
+        except AttributeError:
+            pass
+        return stats
+
+    # --- Lifecycle & Health ---
+
+    async def startup(self) -> None:
+        # Connecting up front means the first request does not pay for it.
+        try:
+            await self.mongo.admin.command("ping")
+        except Exception as e:
+            print(f"WARNING: MongoDB is not reachable at startup. Reason: {e}")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._mongo is not None:
+                self._mongo.close()
+                self._mongo = None
+            if self._sync_mongo is not None:
+                self._sync_mongo.close()
+                self._sync_mongo = None
+            for client in self._aws_clients.values():
+                client.close()
+            self._aws_clients.clear()
+
+    async def readiness(self) -> Dict[str, Any]:
+        """Pings Mongo within READINESS_TIMEOUT_SECONDS; AWS is not called, as that would cost money."""
+        try:
+            await asyncio.wait_for(self.mongo.admin.command("ping"), timeout=settings.READINESS_TIMEOUT_SECONDS)
+            mongo = "ok"
+        except Exception as e:
+            mongo = f"unavailable: {type(e).__name__}"
+        return {"ready": mongo == "ok", "checks": {"mongo": mongo}}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mongo": self.mongo_pool.snapshot(settings.MONGO_MAX_POOL_SIZE),
+            "mongo_sync": self.sync_mongo_pool.snapshot(settings.MONGO_SYNC_MAX_POOL_SIZE) if self._sync_mongo is not None else None,
+            "aws": {name: self._aws_pool_snapshot(client) for name, client in self._aws_clients.items()},
+        }
+
+
+registry = ResourceRegistry()
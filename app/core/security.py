@@ -88,4 +88,16 @@ async def get_current_user(
 def get_current_active_user(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
     # In a real app, you would add a check here like `if not current_user.is_active:`
     # For this project, we'll assume all users are active.
-    return current_user
\ No newline at end of file
+    return current_user
+
+def is_admin(user: UserInDB) -> bool:
+    return user.is_admin or user.email.lower() in {email.lower() for email in settings.ADMIN_EMAILS}
+
+def get_current_admin_user(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
+    """Restricts an endpoint to administrators: users flagged `is_admin` or listed in ADMIN_EMAILS."""
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator privileges required.",
+        )
+    return current_user
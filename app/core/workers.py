@@ -0,0 +1,13 @@
+# app/core/workers.py
+
+from uvicorn.workers import UvicornWorker
+
+
+class VeritasUvicornWorker(UvicornWorker):
+    """
+    Gunicorn worker running the app on uvloop and httptools (both installed with
+    uvicorn[standard]), with the lifespan required so shared clients are opened
+    and closed by each worker.
+    """
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
@@ -0,0 +1,147 @@
+# app/crud/crud_claim.py
+
+import asyncio
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.models.claim import BulkClaimItem, ClaimStatus
+from app.services.aws_service import aws_service
+
+DUPLICATE_KEY_ERROR = 11000
+
+_idempotency_index_ready = False
+
+
+def presign_upload_targets(s3_keys: List[str]) -> Optional[List[dict]]:
+    """
+    Signs one presigned POST per S3 key. Returns None if any signature fails.
+    """
+    upload_urls = []
+    for object_name in s3_keys:
+        presigned_data = aws_service.generate_presigned_post_url(object_name)
+        if not presigned_data:
+            return None
+        upload_urls.append(presigned_data)
+    return upload_urls
+
+
+def new_s3_keys(claim_id: str, file_count: int) -> List[str]:
+    return [f"claims/{claim_id}/file_{uuid.uuid4().hex}" for _ in range(file_count)]
+
+
+async def ensure_idempotency_index(collection: AsyncIOMotorCollection) -> None:
+    """
+    Idempotency keys are unique per adjuster. The index is partial, so claims
+    created one by one (without a key) are not affected.
+    """
+    global _idempotency_index_ready
+    if _idempotency_index_ready:
+        return
+    await collection.create_index(
+        [("adjuster_id", 1), ("idempotency_key", 1)],
+        unique=True,
+        partialFilterExpression={"idempotency_key": {"$exists": True}},
+        name="adjuster_idempotency_key",
+    )
+    _idempotency_index_ready = True
+
+
+async def _sign_concurrently(key_sets: List[List[str]]) -> List[Optional[List[dict]]]:
+    # Signing is local CPU work in boto3; running it in worker threads keeps the
+    # event loop responsive while a large batch is signed.
+    semaphore = asyncio.Semaphore(settings.BULK_PRESIGN_CONCURRENCY)
+
+    async def sign(s3_keys: List[str]):
+        async with semaphore:
+            return await asyncio.to_thread(presign_upload_targets, s3_keys)
+
+    return await asyncio.gather(*(sign(s3_keys) for s3_keys in key_sets))
+
+
+async def bulk_create_claims(collection: AsyncIOMotorCollection, adjuster_id: str, items: List[BulkClaimItem]) -> AsyncIterator[Dict]:
+    """
+    Creates many claims at once, yielding one result per item as each batch is
+    written. Items whose idempotency key already exists are not created again;
+    their upload targets are re-signed instead, so an interrupted import can be
+    resumed by simply sending the same items again.
+    """
+    await ensure_idempotency_index(collection)
+    summary = {"created": 0, "existing": 0, "failed": 0}
+
+    for batch_start in range(0, len(items), settings.BULK_BATCH_SIZE):
+        batch = list(enumerate(items[batch_start:batch_start + settings.BULK_BATCH_SIZE], start=batch_start))
+        keys = list({item.idempotency_key for _, item in batch})
+        existing = {
+            claim["idempotency_key"]: claim
+            async for claim in collection.find({"adjuster_id": adjuster_id, "idempotency_key": {"$in": keys}}, {"id": 1, "idempotency_key": 1, "s3_keys": 1})
+        }
+
+        # Work out which items need a new claim. Keys repeated within the request
+        # are only planned once; the repeats take the first occurrence's result.
+        plans, first_seen = [], set()
+        for index, item in batch:
+            claim = existing.get(item.idempotency_key)
+            if claim is not None:
+                plans.append((index, item, claim["id"], claim.get("s3_keys", []), "existing"))
+            elif item.idempotency_key in first_seen:
+                plans.append((index, item, None, [], "repeated"))
+            else:
+                claim_id = str(uuid.uuid4())
+                first_seen.add(item.idempotency_key)
+                plans.append((index, item, claim_id, new_s3_keys(claim_id, item.file_count), "created"))
+
+        signatures = await _sign_concurrently([s3_keys for _, _, _, s3_keys, _ in plans])
+
+        now = datetime.utcnow()
+        to_insert = [
+            {
+                "id": claim_id, "adjuster_id": adjuster_id, "status": ClaimStatus.UPLOAD_IN_PROGRESS,
+                "file_count": item.file_count, "additional_info": item.additional_info, "incident_date": item.incident_date,
+                "idempotency_key": item.idempotency_key, "created_at": now, "updated_at": now, "s3_keys": s3_keys,
+            }
+            for (_, item, claim_id, s3_keys, outcome), upload_urls in zip(plans, signatures)
+            if outcome == "created" and upload_urls is not None
+        ]
+
+        write_errors: Dict[str, str] = {}
+        if to_insert:
+            try:
+                await collection.insert_many(to_insert, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    key = to_insert[error["index"]]["idempotency_key"]
+                    # A concurrent import created the same key first; report it as existing.
+                    write_errors[key] = "duplicate" if error.get("code") == DUPLICATE_KEY_ERROR else error.get("errmsg", "write failed")
+
+        first_results: Dict[str, Dict] = {}
+        for (index, item, claim_id, s3_keys, outcome), upload_urls in zip(plans, signatures):
+            result = {"index": index, "idempotency_key": item.idempotency_key, "claim_id": claim_id}
+            error = write_errors.get(item.idempotency_key) if outcome == "created" else None
+            if outcome == "repeated":
+                # The first occurrence may itself have failed or turned out to exist already.
+                first = first_results[item.idempotency_key]
+                result.update(claim_id=first["claim_id"])
+                if first["status"] == "failed":
+                    result.update(status="failed", error=first["error"])
+                else:
+                    result.update(status="existing", upload_urls=first["upload_urls"])
+            elif upload_urls is None:
+                result.update(status="failed", error="Could not generate S3 upload URL.")
+            elif error == "duplicate":
+                claim = await collection.find_one({"adjuster_id": adjuster_id, "idempotency_key": item.idempotency_key}, {"id": 1, "s3_keys": 1})
+                upload_urls = await asyncio.to_thread(presign_upload_targets, claim.get("s3_keys", []))
+                result.update(status="existing", claim_id=claim["id"], upload_urls=upload_urls or [])
+            elif error is not None:
+                result.update(status="failed", error=error)
+            else:
+                result.update(status=outcome, upload_urls=upload_urls)
+            first_results.setdefault(item.idempotency_key, result)
+            summary[result["status"]] += 1
+            yield result
+
+    yield {"summary": dict(summary, total=len(items))}
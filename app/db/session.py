@@ -1,17 +1,27 @@
 # app/db/session.py
 
-from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
+from app.core.metrics import InstrumentedCollection
+from app.core.resources import registry
 
 class Database:
-    def __init__(self, db_url: str, db_name: str):
-        self.client = AsyncIOMotorClient(db_url)
-        self.db = self.client[db_name]
+    """The app database, on the shared Motor client owned by the resource registry."""
+
+    def __init__(self, db_name: str):
+        self.db_name = db_name
+
+    @property
+    def client(self):
+        return registry.mongo
+
+    @property
+    def db(self):
+        return registry.mongo[self.db_name]
 
     def get_collection(self, name: str):
-        return self.db[name]
+        return InstrumentedCollection(self.db[name])
 
-db = Database(settings.MONGO_CONNECTION_STRING, settings.MONGO_DB_NAME)
+db = Database(settings.MONGO_DB_NAME)
 
 # Convenience function to get a specific collection
 def get_db_collection(name: str):
@@ -0,0 +1,13 @@
+# app/models/analysis.py
+
+from pydantic import BaseModel, Field
+from typing import List
+
+class SynthesisReport(BaseModel):
+    """
+    The JSON report the synthesis model must return. Responses that do not
+    conform are repaired or retried rather than stored.
+    """
+    summary: str = Field(..., min_length=1)
+    fraud_risk_score: int = Field(..., ge=0, le=100)
+    key_risk_factors: List[str]
@@ -0,0 +1,24 @@
+# app/models/analytics.py
+
+from pydantic import BaseModel
+from typing import Dict, Optional
+from datetime import datetime
+
+class AnalyticsRollup(BaseModel):
+    """
+    Precomputed claim statistics for one adjuster, or for the whole portfolio.
+    Risk distribution buckets are "0-19" ... "80-100", plus "failed" and "unscored".
+    """
+    scope: str
+    adjuster_id: Optional[str] = None
+    claim_count: int
+    by_status: Dict[str, int]
+    risk_distribution: Dict[str, int]
+    avg_risk_score: Optional[float] = None
+    analysed_count: int
+    avg_turnaround_seconds: Optional[float] = None
+    max_turnaround_seconds: Optional[float] = None
+    updated_at: Optional[datetime] = None
+
+class AnalyticsRebuild(BaseModel):
+    adjusters: int
@@ -1,7 +1,7 @@
 # app/models/claim.py
 
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 import uuid
 
@@ -18,6 +18,13 @@ class ClaimCreate(BaseModel):
     file_count: int = Field(..., gt=0, description="Number of files to be uploaded for this claim")
     # --- THIS IS THE MISSING LINE THAT IS CAUSING THE ERROR ---
     additional_info: Optional[str] = Field(None, description="Adjuster's notes or extra context.")
+    incident_date: Optional[datetime] = Field(None, description="When the incident happened; photo dates are checked against it. Defaults to when the claim is filed.")
+
+class BulkClaimItem(ClaimCreate):
+    idempotency_key: str = Field(..., min_length=1, max_length=200, description="Client-chosen key; re-sending the same key never creates a second claim.")
+
+class BulkClaimCreate(BaseModel):
+    items: List[BulkClaimItem] = Field(..., min_length=1, max_length=5000)
 
 class ClaimCreateResponse(BaseModel):
     claim_id: str
@@ -29,7 +36,14 @@ class Claim(ClaimBase):
     status: str = ClaimStatus.UPLOAD_IN_PROGRESS
     summary: Optional[str] = None
     fraud_risk_score: Optional[int] = Field(None, ge=0, le=100)
+    provisional_risk_score: Optional[int] = Field(None, ge=0, le=100)
+    prescreen: Optional[Dict[str, Any]] = None
     key_risk_factors: List[str] = []
     additional_info: Optional[str] = None
+    incident_date: Optional[datetime] = None
+    stage_timings: Dict[str, float] = {}
+    token_usage: List[Dict[str, Any]] = []
+    entity_keys: List[str] = []
+    analysis_completed_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
@@ -22,4 +22,8 @@ class Document(BaseModel):
     extracted_text: Optional[str] = None
     
     # Data fields for image files (populated by Rekognition)
-    image_analysis_results: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    image_analysis_results: Optional[Dict[str, Any]] = None
+
+    # Fields moved to the blob store (see app/services/blob_service.py) are null
+    # above and referenced here by field name.
+    blob_refs: Dict[str, Optional[Dict[str, Any]]] = {}
@@ -0,0 +1,24 @@
+# app/models/entity.py
+
+from pydantic import BaseModel
+from typing import List
+
+class EntityLookup(BaseModel):
+    """
+    A plate, device, location or online image from the cross-claim entity
+    index, with the requesting adjuster's claims it has been seen in.
+    """
+    entity: str
+    type: str
+    value: str
+    claim_count: int
+    claim_ids: List[str]
+
+class EntityLink(BaseModel):
+    """
+    An entity of one claim that also appears in other claims.
+    """
+    entity: str
+    type: str
+    value: str
+    claim_ids: List[str]
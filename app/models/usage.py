@@ -0,0 +1,32 @@
+# app/models/usage.py
+
+from pydantic import BaseModel
+from typing import List
+
+class AnalyzerUsage(BaseModel):
+    """
+    Bedrock consumption aggregated for one analyzer (e.g. text_extraction, synthesis).
+    """
+    analyzer: str
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    request_bytes: int
+    response_bytes: int
+    total_latency_ms: float
+    avg_latency_ms: float
+
+class ClaimUsage(BaseModel):
+    """
+    Bedrock consumption aggregated for a single claim.
+    """
+    claim_id: str
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    request_bytes: int
+    total_latency_ms: float
+
+class UsageReport(BaseModel):
+    by_analyzer: List[AnalyzerUsage]
+    top_claims: List[ClaimUsage]
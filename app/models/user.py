@@ -15,6 +15,7 @@ class UserCreate(UserBase):
 class UserInDBBase(UserBase):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     hashed_password: str
+    is_admin: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class User(UserBase):
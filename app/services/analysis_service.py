@@ -1,40 +1,76 @@
 # app/services/analysis_service.py
 
-import os
 import json
-from pymongo import MongoClient
-from datetime import datetime
-import boto3
 import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
 from typing import List, Dict, Optional
 
-# NOTE: This assumes aws_service is in a location that can be imported.
-# In a real Lambda deployment, this would be part of the deployment package.
-from app.services.aws_service import AWSService
+from pydantic import ValidationError
 
-# --- Initialize outside the handler ---
-MONGO_URI = os.environ.get("MONGO_CONNECTION_STRING")
-MONGO_DB = os.environ.get("MONGO_DB_NAME")
+# Shares the process-wide AWS clients rather than building a second set.
+from app.services.aws_service import aws_service, CONTEXT_FULL_TEXT_HEADER
+from app.core.metrics import BEDROCK_HEDGES, BEDROCK_REPAIRS, track
+from app.models.analysis import SynthesisReport
+from app.core.config import settings
 
-try:
-    client = MongoClient(MONGO_URI)
-    db = client[MONGO_DB]
-    claims_collection = db.claims
-    documents_collection = db.documents
-except Exception as e:
-    print(f"FATAL: Could not connect to MongoDB: {e}")
 
-aws_service = AWSService()
+class SynthesisScheduler:
+    """
+    Caps concurrent Bedrock synthesis calls in this process. When all slots are
+    taken, waiting claims are admitted highest pre-screen risk first (then in
+    arrival order), so during a surge the likely-fraudulent claims are not stuck
+    behind a queue of clean ones.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.active = 0
+        self._waiters: list = []
+        self._order = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, priority: float = 0.0):
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (-priority, next(self._order), waiter))
+            try:
+                # The slot is handed over by `_release`, already counted as active.
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release()
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
 
 
-def get_synthesized_analysis_prompt(
+synthesis_scheduler = SynthesisScheduler(concurrency=settings.SYNTHESIS_CONCURRENCY)
+
+
+def get_prompt_sections(
     claim_texts: List[str],
     image_analyses: List[Dict],
     video_analyses: List[Dict],
-    adjuster_notes: Optional[str]
-) -> str:
+    adjuster_notes: Optional[str],
+    cross_claim_links: Optional[List[Dict]] = None
+) -> Dict[str, str]:
     """
-    Constructs the ultimate forensic analysis prompt for Bedrock.
+    Formats each evidence section of the synthesis prompt. Kept separate from the
+    prompt template so the size of each section can be accounted for.
     """
     full_text = "\n\n--- DOCUMENT TEXT ---\n\n".join(claim_texts)
 
@@ -96,22 +132,42 @@ Detected Objects & Activities: {detected_objects}
 
     notes_section = f"--- ADJUSTER'S NOTES ---\n{adjuster_notes}" if adjuster_notes else "No additional notes were provided."
 
+    link_reports = []
+    for link in cross_claim_links or []:
+        claim_ids = ", ".join(link.get('claim_ids', []))
+        link_reports.append(f"- {link.get('type', 'entity').upper()} '{link.get('value')}' also appears in claim(s): {claim_ids}")
+    full_link_report = "\n".join(link_reports)
+
+    return {
+        "notes": notes_section,
+        "documents": full_text if full_text else "No text was extracted from documents.",
+        "images": full_forensic_report if full_forensic_report else "No images were submitted.",
+        "videos": full_video_report if full_video_report else "No videos were submitted.",
+        "links": full_link_report if full_link_report else "No plates, devices, locations or images are shared with other claims.",
+    }
+
+
+def render_analysis_prompt(sections: Dict[str, str]) -> str:
+    """Places pre-formatted evidence sections into the forensic analysis prompt."""
     prompt = f"""
     You are Veritas AI, a world-class forensic investigator for insurance claims. Your mission is to uncover fraud by meticulously analyzing and cross-referencing all available intelligence. Do not summarize; investigate.
 
     **CASE FILE INTELLIGENCE:**
 
     **1. FIELD NOTES (from the Human Adjuster):**
-    {notes_section}
+    {sections["notes"]}
 
     **2. SUBMITTED DOCUMENTS (The Official Story):**
-    {full_text if full_text else "No text was extracted from documents."}
+    {sections["documents"]}
 
     **3. FORENSIC IMAGE REPORTS (The Ground Truth):**
-    {full_forensic_report if full_forensic_report else "No images were submitted."}
+    {sections["images"]}
 
     **4. VIDEO EVIDENCE (Surveillance and Recordings):**
-    {full_video_report if full_video_report else "No videos were submitted."}
+    {sections["videos"]}
+
+    **5. CROSS-CLAIM LINKS (Entities Seen in Other Claims):**
+    {sections["links"]}
 
     **YOUR FORENSIC ANALYSIS PROTOCOL:**
     You must perform the following checks and synthesize your findings.
@@ -122,6 +178,7 @@ Detected Objects & Activities: {detected_objects}
     - **Geospatial Conflict:** If GPS data is available, does it match the location of the incident described in the documents?
     - **Digital Tampering:** Do the metadata warnings (e.g., "No EXIF data") or content alerts suggest the image was downloaded, screenshotted, or edited?
     - **Fraudulent Reuse:** Is there a "CRITICAL ALERT" from a reverse image search? This is the most severe indicator of fraud.
+    - **Organised Fraud:** Do licence plates, devices, locations or online images from this claim also appear in other claims? Repeated links suggest a fraud ring.
 
     **FINAL REPORT:**
     Based on your forensic protocol, provide your conclusions ONLY in the following strict JSON format:
@@ -137,14 +194,136 @@ Detected Objects & Activities: {detected_objects}
     return prompt
 
 
+# Malformed responses longer than this are truncated in the repair prompt.
+REPAIR_MAX_CHARS = 20000
+
+
+class ReportFormatError(ValueError):
+    """The model's response is not a JSON report matching `SynthesisReport`."""
+
+
+def parse_report(response_text: str) -> Dict:
+    # Models sometimes wrap the JSON in prose or code fences; take the outermost object.
+    json_start = response_text.find('{')
+    json_end = response_text.rfind('}') + 1
+    if json_start == -1 or json_end == 0:
+        raise ReportFormatError("contains no JSON object")
+    try:
+        return SynthesisReport.model_validate(json.loads(response_text[json_start:json_end])).model_dump()
+    except json.JSONDecodeError as e:
+        raise ReportFormatError(f"is not valid JSON ({e.msg} at position {e.pos})") from e
+    except ValidationError as e:
+        problems = "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'report'}: {err['msg']}" for err in e.errors())
+        raise ReportFormatError(f"does not match the required schema ({problems})") from e
+
+
+def render_repair_prompt(response_text: str, error: ReportFormatError) -> str:
+    """
+    A targeted follow-up: only the malformed output is sent back, not the case
+    file, so a repair costs a fraction of a second synthesis.
+    """
+    return (
+        "The response below was meant to be a single JSON object with exactly these keys: "
+        '"summary" (non-empty string), "fraud_risk_score" (integer from 0 to 100) and '
+        f'"key_risk_factors" (list of strings). It {error}.\n'
+        "Return only the corrected JSON object, keeping the original findings. Do not add any other text.\n\n"
+        f"Response:\n{response_text[:REPAIR_MAX_CHARS]}"
+    )
+
+
+
+def _invoke_recorded(prompt: str, analyzer: str, model_id: str, usages: List[Dict]) -> Dict:
+    # Records the usage in the worker thread itself: cancelling an abandoned hedge
+    # only stops the await, the call still completes and its tokens are billed.
+    response = aws_service.invoke_bedrock_model(prompt, analyzer, model_id)
+    usages.append(response["usage"])
+    return response
+
+
+async def _attempt_synthesis(prompt: str, model_id: str, analyzer: str, usages: List[Dict]) -> Dict:
+    """One synthesis call on one model, followed by repair retries if its output is malformed."""
+    response = await asyncio.to_thread(_invoke_recorded, prompt, analyzer, model_id, usages)
+    try:
+        return parse_report(response["text"])
+    except ReportFormatError as e:
+        text, error = response["text"], e
+
+    for _ in range(settings.BEDROCK_REPAIR_ATTEMPTS):
+        response = await asyncio.to_thread(_invoke_recorded, render_repair_prompt(text, error), "synthesis_repair", model_id, usages)
+        try:
+            report = parse_report(response["text"])
+        except ReportFormatError as e:
+            text, error = response["text"], e
+            continue
+        BEDROCK_REPAIRS.labels("succeeded").inc()
+        return report
+    BEDROCK_REPAIRS.labels("failed").inc()
+    raise error
+
+
+async def synthesize_report(prompt: str, usages: List[Dict]) -> Dict:
+    """
+    Runs synthesis on BEDROCK_MODEL_ID, hedged with BEDROCK_FALLBACK_MODEL_IDS: a
+    backup fires when the calls in flight have not produced a valid report within
+    BEDROCK_HEDGE_AFTER_SECONDS, or immediately when they all fail. The first
+    schema-conforming report wins and the rest are abandoned. Returns the report;
+    the usage record of every completed call is appended to `usages`, also when
+    synthesis fails, so failed attempts are still accounted to the claim. Calls
+    abandoned mid-flight append theirs when they return, possibly after this does.
+    """
+    model_ids = [settings.BEDROCK_MODEL_ID, *settings.BEDROCK_FALLBACK_MODEL_IDS]
+    in_flight: Dict[asyncio.Task, str] = {}
+    launched = 0
+    last_error: Optional[Exception] = None
+
+    def launch(trigger: str) -> None:
+        nonlocal launched
+        analyzer = "synthesis" if trigger == "primary" else "synthesis_hedge"
+        task = asyncio.create_task(_attempt_synthesis(prompt, model_ids[launched], analyzer, usages))
+        in_flight[task] = trigger
+        launched += 1
+
+    launch("primary")
+    try:
+        while in_flight:
+            can_hedge = launched < len(model_ids) and settings.BEDROCK_HEDGE_AFTER_SECONDS is not None
+            done, _ = await asyncio.wait(in_flight, timeout=settings.BEDROCK_HEDGE_AFTER_SECONDS if can_hedge else None, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch("latency")
+                continue
+            for task in done:
+                trigger = in_flight.pop(task)
+                if task.exception() is None:
+                    if trigger != "primary":
+                        BEDROCK_HEDGES.labels(trigger, "true").inc()
+                    return task.result()
+                last_error = task.exception()
+                print(f"WARNING: Synthesis attempt ({trigger}) failed. Reason: {last_error}")
+                if trigger != "primary":
+                    BEDROCK_HEDGES.labels(trigger, "false").inc()
+            if not in_flight and launched < len(model_ids):
+                launch("failure")
+        raise last_error
+    finally:
+        # Losing calls finish in their threads; their results are ignored but their usage is kept.
+        for task, trigger in in_flight.items():
+            task.cancel()
+            if trigger != "primary":
+                BEDROCK_HEDGES.labels(trigger, "false").inc()
+
+
 async def analyze_claim_bundle(
     claim_texts: List[str],
     image_analyses: List[Dict],
     video_analyses: List[Dict],
-    adjuster_notes: Optional[str]
+    adjuster_notes: Optional[str],
+    cross_claim_links: Optional[List[Dict]] = None,
+    priority: float = 0.0
 ) -> Dict:
     """
     Orchestrates the claim analysis using Amazon Bedrock to synthesize all data.
+    The report also carries the `usage` records of every Bedrock call made for it.
+    `priority` (the pre-screen risk score) orders claims waiting for a synthesis slot.
     """
     if not any([claim_texts, image_analyses, video_analyses, adjuster_notes]):
         return {
@@ -153,24 +332,33 @@ async def analyze_claim_bundle(
             "key_risk_factors": []
         }
 
-    prompt = get_synthesized_analysis_prompt(claim_texts, image_analyses, video_analyses, adjuster_notes)
+    sections = get_prompt_sections(claim_texts, image_analyses, video_analyses, adjuster_notes, cross_claim_links)
+    prompt = render_analysis_prompt(sections)
+    section_bytes = {name: len(text.encode('utf-8')) for name, text in sections.items()}
 
+    usages: List[Dict] = []
     try:
-        response = aws_service.invoke_bedrock_model(prompt)
-        # Attempt to find a valid JSON object within the model's response text
-        response_text = response["text"]
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
-        if json_start != -1 and json_end != -1:
-            json_str = response_text[json_start:json_end]
-            analysis_result = json.loads(json_str)
-            return analysis_result
-        else:
-            raise json.JSONDecodeError("No valid JSON object found in the model's response.", response_text, 0)
-    except (Exception, json.JSONDecodeError) as e:
+        async with synthesis_scheduler.slot(priority):
+            with track("bedrock", "synthesis"):
+                analysis_result = await synthesize_report(prompt, usages)
+    except Exception as e:
         print(f"FATAL: AI synthesis failed. Reason: {e}")
-        return {
+        analysis_result = {
             "summary": "AI synthesis failed due to a processing error. Please review manually.",
             "fraud_risk_score": -1,
             "key_risk_factors": ["Critical AI model processing error."]
-        }
\ No newline at end of file
+        }
+    # Failed reports carry their usage too: the tokens were spent either way.
+    for usage in usages:
+        if usage["analyzer"] != "synthesis_repair":
+            usage["prompt_section_bytes"] = section_bytes
+    analysis_result["usage"] = usages
+    return analysis_result
+
+
+def render_q_context(claim_id: str, report: Dict, claim_texts: List[str]) -> str:
+    """The claim's context file for the Amazon Q data source: the report followed by the full extracted text."""
+    context_content = f"Claim ID: {claim_id}\nFraud Risk Score: {report.get('fraud_risk_score')}%\nSummary: {report.get('summary')}\n\nKey Risk Factors:\n"
+    for factor in report.get('key_risk_factors', []):
+        context_content += f"- {factor}\n"
+    return context_content + CONTEXT_FULL_TEXT_HEADER + "\n".join(claim_texts)
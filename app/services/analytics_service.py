@@ -0,0 +1,210 @@
+# app/services/analytics_service.py
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.db.session import get_db_collection
+
+# Portfolio analytics are served from precomputed rollups, one document per
+# adjuster plus one for the whole portfolio, so a dashboard read is a single
+# _id lookup however many claims exist. A claim status change only marks its
+# adjuster dirty; the rollups are rebuilt shortly after, off the request path.
+
+ROLLUP_COLLECTION = "analytics_rollups"
+PORTFOLIO_ID = "portfolio"
+
+# Lower bounds of the risk score buckets. -1 is a failed synthesis; claims
+# without any score yet fall into "unscored".
+RISK_BOUNDARIES = [-1, 0, 20, 40, 60, 80, 101]
+
+
+def adjuster_rollup_id(adjuster_id: str) -> str:
+    return f"adjuster:{adjuster_id}"
+
+
+def _first(facet: str, field: str, default: Any = 0) -> Dict[str, Any]:
+    return {"$ifNull": [{"$arrayElemAt": [f"${facet}.{field}", 0]}, default]}
+
+
+def _as_object(facet: str) -> Dict[str, Any]:
+    return {"$arrayToObject": {"$map": {"input": f"${facet}", "in": {"k": {"$toString": "$$this._id"}, "v": "$$this.n"}}}}
+
+
+def _shape_and_merge(rollup_id: str, scope: str, adjuster_id: Optional[str]) -> List[Dict[str, Any]]:
+    """Turns the facets into one rollup document and upserts it with $merge."""
+    return [
+        {"$project": {
+            "_id": {"$literal": rollup_id},
+            "scope": {"$literal": scope},
+            "adjuster_id": {"$literal": adjuster_id},
+            "claim_count": _first("totals", "claim_count"),
+            "scored_count": _first("totals", "scored_count"),
+            "risk_score_sum": _first("totals", "risk_score_sum"),
+            "by_status": _as_object("by_status"),
+            "risk_buckets": _as_object("risk_buckets"),
+            "turnaround": {
+                "count": _first("turnaround", "count"),
+                "total_seconds": _first("turnaround", "total_seconds"),
+                "max_seconds": _first("turnaround", "max_seconds", None),
+            },
+            "updated_at": {"$literal": datetime.utcnow()},
+        }},
+        {"$merge": {"into": ROLLUP_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+
+def adjuster_rollup_pipeline(adjuster_id: str) -> List[Dict[str, Any]]:
+    """Recomputes one adjuster's rollup from their claims (served by the adjuster_id index)."""
+    scored = {"$gte": ["$fraud_risk_score", 0]}
+    return [
+        {"$match": {"adjuster_id": adjuster_id}},
+        {"$project": {"status": 1, "fraud_risk_score": 1, "created_at": 1, "analysis_completed_at": 1}},
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "claim_count": {"$sum": 1},
+                "scored_count": {"$sum": {"$cond": [scored, 1, 0]}},
+                "risk_score_sum": {"$sum": {"$cond": [scored, "$fraud_risk_score", 0]}},
+            }}],
+            "by_status": [{"$group": {"_id": "$status", "n": {"$sum": 1}}}],
+            "risk_buckets": [{"$bucket": {"groupBy": "$fraud_risk_score", "boundaries": RISK_BOUNDARIES, "default": "unscored", "output": {"n": {"$sum": 1}}}}],
+            "turnaround": [
+                {"$match": {"analysis_completed_at": {"$ne": None}, "created_at": {"$ne": None}}},
+                {"$project": {"seconds": {"$divide": [{"$subtract": ["$analysis_completed_at", "$created_at"]}, 1000]}}},
+                {"$group": {"_id": None, "count": {"$sum": 1}, "total_seconds": {"$sum": "$seconds"}, "max_seconds": {"$max": "$seconds"}}},
+            ],
+        }},
+    ] + _shape_and_merge(adjuster_rollup_id(adjuster_id), "adjuster", adjuster_id)
+
+
+def portfolio_rollup_pipeline() -> List[Dict[str, Any]]:
+    """Combines the adjuster rollups (not the claims) into the portfolio rollup."""
+    def merged(field: str) -> List[Dict[str, Any]]:
+        return [
+            {"$project": {"entry": {"$objectToArray": f"${field}"}}},
+            {"$unwind": "$entry"},
+            {"$group": {"_id": "$entry.k", "n": {"$sum": "$entry.v"}}},
+        ]
+
+    return [
+        {"$match": {"scope": "adjuster"}},
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "claim_count": {"$sum": "$claim_count"},
+                "scored_count": {"$sum": "$scored_count"},
+                "risk_score_sum": {"$sum": "$risk_score_sum"},
+            }}],
+            "by_status": merged("by_status"),
+            "risk_buckets": merged("risk_buckets"),
+            "turnaround": [{"$group": {
+                "_id": None,
+                "count": {"$sum": "$turnaround.count"},
+                "total_seconds": {"$sum": "$turnaround.total_seconds"},
+                "max_seconds": {"$max": "$turnaround.max_seconds"},
+            }}],
+        }},
+    ] + _shape_and_merge(PORTFOLIO_ID, "portfolio", None)
+
+
+def risk_bucket_label(lower_bound: str) -> str:
+    if lower_bound == "unscored":
+        return "unscored"
+    if lower_bound == "-1":
+        return "failed"
+    upper = RISK_BOUNDARIES[RISK_BOUNDARIES.index(int(lower_bound)) + 1] - 1
+    return f"{lower_bound}-{min(upper, 100)}"
+
+
+def rollup_view(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    """The stored rollup with averages and readable bucket labels, as returned by the API."""
+    turnaround = rollup.get("turnaround") or {}
+    return {
+        "scope": rollup["scope"],
+        "adjuster_id": rollup.get("adjuster_id"),
+        "claim_count": rollup.get("claim_count", 0),
+        "by_status": rollup.get("by_status") or {},
+        "risk_distribution": {risk_bucket_label(k): v for k, v in (rollup.get("risk_buckets") or {}).items()},
+        "avg_risk_score": round(rollup["risk_score_sum"] / rollup["scored_count"], 1) if rollup.get("scored_count") else None,
+        "analysed_count": turnaround.get("count", 0),
+        "avg_turnaround_seconds": round(turnaround["total_seconds"] / turnaround["count"], 1) if turnaround.get("count") else None,
+        "max_turnaround_seconds": turnaround.get("max_seconds"),
+        "updated_at": rollup.get("updated_at"),
+    }
+
+
+class AnalyticsRollups:
+    """
+    Keeps the rollups current. Status changes call `mark_dirty`, which is only a
+    set insert; a single background task waits `debounce` seconds so a burst of
+    changes (e.g. a bulk import) costs one recomputation per adjuster.
+    """
+
+    def __init__(self, debounce: float):
+        self.debounce = debounce
+        self._dirty: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._index_ready = False
+
+    def mark_dirty(self, adjuster_id: Optional[str]) -> None:
+        if not adjuster_id:
+            return
+        self._dirty.add(adjuster_id)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._dirty:
+            await asyncio.sleep(self.debounce)
+            adjuster_ids, self._dirty = self._dirty, set()
+            try:
+                await self.refresh(adjuster_ids)
+            except asyncio.CancelledError:
+                # Cancelled by `stop` mid-refresh; it flushes these instead.
+                self._dirty |= adjuster_ids
+                raise
+            except Exception as e:
+                # Keep the task alive and put the adjusters back, so they are retried after the next debounce.
+                self._dirty |= adjuster_ids
+                print(f"WARNING: Could not refresh analytics rollups. Reason: {e}")
+
+    async def refresh(self, adjuster_ids: Set[str]) -> None:
+        claims = get_db_collection("claims")
+        if not self._index_ready:
+            await claims.create_index("adjuster_id")
+            self._index_ready = True
+        for adjuster_id in adjuster_ids:
+            await claims.aggregate(adjuster_rollup_pipeline(adjuster_id)).to_list(length=None)
+        await get_db_collection(ROLLUP_COLLECTION).aggregate(portfolio_rollup_pipeline()).to_list(length=None)
+
+    async def rebuild(self) -> int:
+        """Recomputes every rollup from scratch, e.g. after a migration. Returns the number of adjusters."""
+        adjuster_ids = set(await get_db_collection("claims").distinct("adjuster_id"))
+        await get_db_collection(ROLLUP_COLLECTION).delete_many({"scope": "adjuster", "adjuster_id": {"$nin": list(adjuster_ids)}})
+        await self.refresh(adjuster_ids)
+        return len(adjuster_ids)
+
+    async def get(self, rollup_id: str) -> Optional[Dict[str, Any]]:
+        rollup = await get_db_collection(ROLLUP_COLLECTION).find_one({"_id": rollup_id})
+        return rollup_view(rollup) if rollup else None
+
+    async def stop(self) -> None:
+        """Flushes pending changes on shutdown rather than dropping them. Never raises."""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._dirty:
+            adjuster_ids, self._dirty = self._dirty, set()
+            try:
+                await self.refresh(adjuster_ids)
+            except Exception as e:
+                print(f"WARNING: Could not flush analytics rollups on shutdown. Reason: {e}")
+
+
+analytics_rollups = AnalyticsRollups(debounce=settings.ANALYTICS_DEBOUNCE_SECONDS)
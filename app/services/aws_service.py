@@ -1,26 +1,46 @@
 # app/services/aws_service.py
 
-import boto3
 import json
-import base64
-from botocore.client import Config
 from botocore.exceptions import ClientError
 from app.core.config import settings
+from app.core.resources import registry
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple, Union, BinaryIO
 import io
+import tempfile
+import time
 import exifread
 from fastapi import HTTPException
+from app.core.metrics import instrument, record_bedrock_usage
+from app.services.payload_service import DATA_PLACEHOLDER, build_document_payload, memory_budget, payload_reservation
+
+def _parse_exif_gps(tags: dict) -> Optional[Dict[str, float]]:
+    """Converts EXIF degree/minute/second GPS tags into decimal coordinates."""
+    try:
+        coords = {}
+        for axis, negative_ref in (("Latitude", "S"), ("Longitude", "W")):
+            values = tags[f'GPS GPS{axis}'].values
+            decimal = sum(float(v.num) / float(v.den) / (60 ** i) for i, v in enumerate(values))
+            if str(tags.get(f'GPS GPS{axis}Ref', '')).upper() == negative_ref:
+                decimal = -decimal
+            coords[axis.lower()] = round(decimal, 6)
+        return coords
+    except (KeyError, ZeroDivisionError, AttributeError):
+        return None
+
+# Separates the case summary from the raw document text in the Q context file.
+CONTEXT_FULL_TEXT_HEADER = "\n--- Full Extracted Text ---\n"
 
 class AWSService:
     def __init__(self):
         """Initializes all required AWS and Google service clients."""
-        session = boto3.Session(region_name=settings.AWS_REGION)
-        self.s3_client = session.client("s3", config=Config(signature_version='s3v4'))
-        self.bedrock_runtime = session.client("bedrock-runtime")
-        self.q_client = session.client("qbusiness")
-        self.rekognition_client = session.client("rekognition")
+        # Clients (and their connection pools) are owned by the registry and shared
+        # by every AWSService in the process.
+        self.s3_client = registry.aws_client("s3", signature_version='s3v4')
+        self.bedrock_runtime = registry.aws_client("bedrock-runtime")
+        self.q_client = registry.aws_client("qbusiness")
+        self.rekognition_client = registry.aws_client("rekognition")
 
         if settings.GOOGLE_API_KEY and settings.GOOGLE_CUSTOM_SEARCH_ENGINE_ID:
             try:
@@ -32,6 +52,7 @@ class AWSService:
             print("INFO: Google API Key or Search Engine ID not configured.")
             self.google_search_service = None
 
+    @instrument("aws")
     def generate_presigned_post_url(self, object_name: str) -> Optional[Dict[str, Any]]:
         try:
             return self.s3_client.generate_presigned_post(Bucket=settings.S3_UPLOADS_BUCKET_NAME, Key=object_name, ExpiresIn=3600)
@@ -39,6 +60,17 @@ class AWSService:
             print(f"FATAL: Error generating presigned URL: {e}")
             return None
 
+    @instrument("aws")
+    def get_object_etag(self, s3_key: str) -> Optional[str]:
+        """The object's ETag, used as a cheap content hash (identical uploads share it)."""
+        try:
+            response = self.s3_client.head_object(Bucket=settings.S3_UPLOADS_BUCKET_NAME, Key=s3_key)
+        except ClientError as e:
+            print(f"WARNING: Could not read ETag for {s3_key}: {e}")
+            return None
+        return response.get("ETag", "").strip('"') or None
+
+    @instrument("aws")
     def analyze_image_forensics(self, s3_key: str) -> Dict[str, Any]:
         results = {"forensic_alerts": [], "detected_objects": [], "detected_text": []}
         s3_object = {'Bucket': settings.S3_UPLOADS_BUCKET_NAME, 'Name': s3_key}
@@ -51,6 +83,7 @@ class AWSService:
             results["forensic_alerts"].append(f"Rekognition content analysis failed: {e}")
         return results
 
+    @instrument("aws")
     def reverse_image_search(self, s3_key: str) -> Dict[str, Any]:
         results = {"match_found": False, "urls": [], "search_status": "not_configured"}
         if not self.google_search_service:
@@ -68,59 +101,103 @@ class AWSService:
             results["search_status"] = f"API Error: {e.resp.status} {e.resp.reason}"
         return results
 
-    def extract_text_from_file_with_bedrock(self, s3_key: str) -> str:
+    def _invoke_bedrock(self, body: Union[str, BinaryIO], request_bytes: int, analyzer: str, model_id: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Calls the Bedrock model (BEDROCK_MODEL_ID unless another model ID or inference
+        profile is given) and returns the parsed response body together with a usage
+        record (token counts, payload sizes and model latency) for accounting.
+        """
+        model_id = model_id or settings.BEDROCK_MODEL_ID
+        started = time.perf_counter()
+        response = self.bedrock_runtime.invoke_model(body=body, modelId=model_id, accept="application/json", contentType="application/json")
+        raw_body = response.get("body").read()
+        latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        response_body = json.loads(raw_body)
+        tokens = response_body.get("usage", {})
+        usage = {
+            "analyzer": analyzer,
+            "model_id": model_id,
+            "input_tokens": tokens.get("input_tokens", 0),
+            "output_tokens": tokens.get("output_tokens", 0),
+            "request_bytes": request_bytes,
+            "response_bytes": len(raw_body),
+            "latency_ms": latency_ms,
+        }
+        record_bedrock_usage(usage)
+        return response_body, usage
+
+    @instrument("aws")
+    def extract_text_from_file_with_bedrock(self, s3_key: str) -> Dict[str, Any]:
+        """Returns the extracted text, an `ok` flag and the Bedrock usage record. On failure `text` is the error."""
         try:
             s3_object = self.s3_client.get_object(Bucket=settings.S3_UPLOADS_BUCKET_NAME, Key=s3_key)
-            file_bytes = s3_object['Body'].read()
-            base64_encoded_data = base64.b64encode(file_bytes).decode('utf-8')
             media_type = "image/jpeg"
             if s3_key.lower().endswith('.png'): media_type = "image/png"
             elif s3_key.lower().endswith('.pdf'): media_type = "application/pdf"
             prompt = "Extract all text verbatim from the document. Do not summarize or add commentary."
-            body = json.dumps({
+            request = {
                 "anthropic_version": "bedrock-2023-05-31", "max_tokens": 4096,
                 "messages": [{"role": "user", "content": [
-                    {"type": "image", "source": {"type": "base64", "media_type": media_type, "data": base64_encoded_data}},
+                    {"type": "image", "source": {"type": "base64", "media_type": media_type, "data": DATA_PLACEHOLDER}},
                     {"type": "text", "text": prompt}
                 ]}]
-            })
-            response = self.bedrock_runtime.invoke_model(body=body, modelId=settings.BEDROCK_MODEL_ID, accept="application/json", contentType="application/json")
-            response_body = json.loads(response.get("body").read())
-            return response_body.get('content', [{}])[0].get('text', '')
+            }
+            # The file is streamed from S3 into the request body chunk by chunk, so
+            # memory use is bounded by the spool size rather than the file size.
+            with memory_budget.reserve(payload_reservation(s3_object.get('ContentLength', 0))):
+                body, body_length = build_document_payload(s3_object['Body'], request)
+                with body:
+                    response_body, usage = self._invoke_bedrock(body, body_length, analyzer="text_extraction")
+            usage["s3_key"] = s3_key
+            return {"ok": True, "text": response_body.get('content', [{}])[0].get('text', ''), "usage": usage}
         except Exception as e:
             print(f"FATAL: Bedrock text extraction failed for {s3_key}. Reason: {e}")
-            return f"Error extracting text from file: {s3_key}. Reason: {e}"
+            return {"ok": False, "text": f"Error extracting text from file: {s3_key}. Reason: {e}", "usage": None}
 
-    def invoke_bedrock_model(self, prompt: str) -> Dict[str, Any]:
+    @instrument("aws")
+    def invoke_bedrock_model(self, prompt: str, analyzer: str = "synthesis", model_id: Optional[str] = None) -> Dict[str, Any]:
         try:
             body = json.dumps({
                 "anthropic_version": "bedrock-2023-05-31", "max_tokens": 4096,
                 "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}]
             })
-            response = self.bedrock_runtime.invoke_model(body=body, modelId=settings.BEDROCK_MODEL_ID, accept="application/json", contentType="application/json")
-            response_body = json.loads(response.get("body").read())
-            return {"text": response_body.get('content', [{}])[0].get('text', '')}
+            response_body, usage = self._invoke_bedrock(body, len(body), analyzer=analyzer, model_id=model_id)
+            return {"text": response_body.get('content', [{}])[0].get('text', ''), "usage": usage}
         except ClientError as e:
             print(f"FATAL: Error invoking Bedrock model: {e}")
             raise
 
+    @instrument("aws")
     def extract_image_metadata(self, s3_key: str) -> dict:
         metadata = {"date_time_original": None, "camera_model": None, "gps_info": None, "warnings": []}
         try:
-            s3_object = self.s3_client.get_object(Bucket=settings.S3_UPLOADS_BUCKET_NAME, Key=s3_key)
+            # JPEG EXIF sits at the start of the file, so a ranged GET of the header is
+            # enough; other formats without metadata there are streamed in full.
+            s3_object = self.s3_client.get_object(Bucket=settings.S3_UPLOADS_BUCKET_NAME, Key=s3_key, Range=f"bytes=0-{settings.EXIF_HEADER_BYTES - 1}")
             tags = exifread.process_file(io.BytesIO(s3_object['Body'].read()), details=False)
+            if not tags and not s3_key.lower().endswith(('.jpg', '.jpeg')) and s3_object.get('ContentLength', 0) >= settings.EXIF_HEADER_BYTES:
+                s3_object = self.s3_client.get_object(Bucket=settings.S3_UPLOADS_BUCKET_NAME, Key=s3_key)
+                with tempfile.SpooledTemporaryFile(max_size=settings.PAYLOAD_SPOOL_MAX_BYTES) as spooled:
+                    for chunk in s3_object['Body'].iter_chunks(settings.PAYLOAD_CHUNK_BYTES):
+                        spooled.write(chunk)
+                    spooled.seek(0)
+                    tags = exifread.process_file(spooled, details=False)
             if not tags:
                 metadata["warnings"].append("No EXIF metadata found.")
                 return metadata
             if 'EXIF DateTimeOriginal' in tags: metadata["date_time_original"] = str(tags['EXIF DateTimeOriginal'])
             if 'Image Model' in tags: metadata["camera_model"] = str(tags['Image Model'])
+            metadata["gps_info"] = _parse_exif_gps(tags)
         except Exception as e:
             metadata["warnings"].append("Error extracting metadata.")
         return metadata
 
-    def start_q_conversation_with_context(self, claim_id: str) -> Dict[str, Any]:
+    @instrument("aws")
+    def start_q_conversation_with_context(self, claim_id: str, include_full_text: bool = True) -> Dict[str, Any]:
         """
         Starts a new Amazon Q conversation, pre-loading it with context by including it in the initial message.
+        When the claim has a retrieval index, pass include_full_text=False to seed only the case summary;
+        relevant passages are then sent with each question instead.
         """
         try:
             context_s3_key = f"claims_context/{claim_id}.txt"
@@ -128,6 +205,8 @@ class AWSService:
             # 1. Fetch the context content from the S3 file.
             s3_object = self.s3_client.get_object(Bucket=settings.Q_DATASOURCE_BUCKET_NAME, Key=context_s3_key)
             context_content = s3_object['Body'].read().decode('utf-8')
+            if not include_full_text:
+                context_content = context_content.split(CONTEXT_FULL_TEXT_HEADER, 1)[0]
             
             system_prompt = "You are an AI insurance investigator. Use only the information in the following case file to answer."
             
@@ -151,6 +230,7 @@ class AWSService:
             # Re-raise the exception to be caught by the endpoint handler
             raise
 
+    @instrument("aws")
     def query_q_conversation(self, conversation_id: str, parent_message_id: str, query: str) -> Dict[str, Any]:
         """
         Sends a follow-up question to an existing conversation, including the parentMessageId.
@@ -0,0 +1,137 @@
+# app/services/blob_service.py
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Set
+
+from app.core.config import settings
+from app.core.metrics import instrument
+from app.services.aws_service import aws_service
+
+# Document fields that can grow without bound. When one is larger than
+# BLOB_INLINE_MAX_BYTES it is stored in S3 instead, and the document keeps only
+# `blob_refs.<field>` (key, digest and sizes) with the field itself set to null.
+BLOB_FIELDS = ("extracted_text", "image_analysis_results", "video_analysis_results")
+
+
+def encode(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class BlobStore:
+    """
+    Content-addressed, gzipped JSON blobs in S3 under `blobs/{claim_id}/{sha256}.json.gz`.
+    Blobs never change once written, so loaded values are cached in-process by
+    digest without any expiry.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, digest: str, value: Any) -> None:
+        with self._lock:
+            self._cache[digest] = value
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    @instrument("blobs", "put")
+    def put(self, claim_id: str, raw: bytes) -> Dict[str, Any]:
+        digest = hashlib.sha256(raw).hexdigest()
+        body = gzip.compress(raw)
+        key = f"blobs/{claim_id}/{digest}.json.gz"
+        aws_service.s3_client.put_object(Bucket=settings.S3_UPLOADS_BUCKET_NAME, Key=key, Body=body, ContentType="application/gzip")
+        return {"key": key, "sha256": digest, "size": len(raw), "stored_size": len(body)}
+
+    @instrument("blobs", "get")
+    def get(self, ref: Dict[str, Any]) -> Any:
+        with self._lock:
+            if ref["sha256"] in self._cache:
+                self._cache.move_to_end(ref["sha256"])
+                return self._cache[ref["sha256"]]
+        s3_object = aws_service.s3_client.get_object(Bucket=settings.S3_UPLOADS_BUCKET_NAME, Key=ref["key"])
+        raw = gzip.decompress(s3_object["Body"].read())
+        if hashlib.sha256(raw).hexdigest() != ref["sha256"]:
+            raise ValueError(f"Blob {ref['key']} does not match its digest.")
+        value = json.loads(raw)
+        self._remember(ref["sha256"], value)
+        return value
+
+    @instrument("blobs", "prune")
+    def prune(self, claim_id: str, referenced_keys: Set[str], grace_seconds: float) -> int:
+        """
+        Deletes the claim's blobs that no document references any more and that are
+        older than `grace_seconds`. Returns the number of blobs deleted.
+
+        A blob is shared by every document of the claim with the same content, so
+        only the full set of the claim's references can tell that one is unused.
+        Re-putting an existing blob refreshes its LastModified, which keeps the
+        grace period valid for a rewrite that is still in progress.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+        paginator = aws_service.s3_client.get_paginator("list_objects_v2")
+        stale = [
+            {"Key": s3_object["Key"]}
+            for page in paginator.paginate(Bucket=settings.S3_UPLOADS_BUCKET_NAME, Prefix=f"blobs/{claim_id}/")
+            for s3_object in page.get("Contents", [])
+            if s3_object["Key"] not in referenced_keys and s3_object["LastModified"] < cutoff
+        ]
+        for start in range(0, len(stale), 1000):
+            aws_service.s3_client.delete_objects(Bucket=settings.S3_UPLOADS_BUCKET_NAME, Delete={"Objects": stale[start:start + 1000], "Quiet": True})
+        return len(stale)
+
+
+blob_store = BlobStore(max_entries=settings.BLOB_CACHE_SIZE)
+
+
+def offload_fields(claim_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turns a document's fields into `$set` fields, moving large blob fields to S3.
+    Every blob field present also sets its `blob_refs` entry (null when the value
+    stays inline), so a rewrite never leaves a stale reference in the document.
+    The blob it superseded stays in S3 until `prune_blobs` removes it. Uploads
+    are blocking; call it from a worker thread in async code.
+    """
+    update = {}
+    for name, value in fields.items():
+        if name not in BLOB_FIELDS:
+            update[name] = value
+            continue
+        raw = encode(value) if value is not None else b""
+        if len(raw) > settings.BLOB_INLINE_MAX_BYTES:
+            update[name], update[f"blob_refs.{name}"] = None, blob_store.put(claim_id, raw)
+        else:
+            update[name], update[f"blob_refs.{name}"] = value, None
+    return update
+
+
+def referenced_keys(documents: Iterable[Dict[str, Any]]) -> Set[str]:
+    return {ref["key"] for document in documents for ref in (document.get("blob_refs") or {}).values() if ref}
+
+
+def prune_blobs(claim_id: str, documents: Iterable[Dict[str, Any]]) -> int:
+    """
+    Deletes the claim's superseded blobs, given all of the claim's document
+    records. Blocking; call it from a worker thread in async code.
+    """
+    return blob_store.prune(claim_id, referenced_keys(documents), settings.BLOB_PRUNE_GRACE_SECONDS)
+
+
+def load_fields(document: Dict[str, Any], fields: Iterable[str] = BLOB_FIELDS) -> Dict[str, Any]:
+    """
+    Returns a copy of the document with the requested blob fields loaded back from
+    S3. Fields stored inline (including documents written before offloading
+    existed) are left as they are.
+    """
+    refs: Dict[str, Optional[Dict[str, Any]]] = document.get("blob_refs") or {}
+    loaded = dict(document)
+    for name in fields:
+        if refs.get(name):
+            loaded[name] = blob_store.get(refs[name])
+    return loaded
@@ -0,0 +1,235 @@
+# app/services/claim_analysis_service.py
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import StageTimer
+from app.db.session import get_db_collection
+from app.services.aws_service import aws_service
+from app.services.analysis_service import analyze_claim_bundle, render_q_context
+from app.services.analytics_service import analytics_rollups
+from app.services.blob_service import offload_fields, prune_blobs
+from app.services.enrichment_service import NOT_CONFIGURED_REVERSE_SEARCH, PENDING_REVERSE_SEARCH, REVERSE_SEARCH, cached_reverse_search, enqueue_operation, reverse_search_configured
+from app.services.entity_service import build_index_operations, extract_entities, find_linked_claims
+from app.services.prescreen_service import extract_features, prescreen, prescreen_report, reference_date, should_skip_synthesis
+from app.services.retrieval_service import build_index, index_store
+
+
+async def run_analysis_pipeline(claim: Dict[str, Any], full_synthesis: bool = False) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Runs the full analysis of one claim: per-file extraction and forensics, the
+    entity index, pre-screening, synthesis, the co-pilot context and retrieval
+    index. Returns the claim fields to store on completion and the claim's entity
+    keys; writing them is left to the caller, which holds the analysis lease.
+    """
+    claim_id = claim["id"]
+    timer = StageTimer()
+    
+    texts_for_analysis, images_for_analysis, token_usage, indexed_sources, entity_keys = [], [], [], [], []
+    deferred_searches = []
+    s3_keys_to_process = claim.get("s3_keys", [])
+    documents_collection = get_db_collection("documents")
+
+    for s3_key in s3_keys_to_process:
+        original_filename = s3_key.split('/')[-1]
+        file_extension = s3_key.split('.')[-1].lower()
+        is_image = file_extension in ['jpg', 'jpeg', 'png']
+        document = {"original_filename": original_filename, "file_type": f"image/{file_extension}" if is_image else "document/mixed"}
+        
+        try:
+            with timer.stage("text_extraction"):
+                # In a worker thread: the call may wait on the payload memory budget,
+                # which must never block the event loop the budget's holders run on.
+                extraction = await asyncio.to_thread(aws_service.extract_text_from_file_with_bedrock, s3_key)
+            texts_for_analysis.append(extraction["text"])
+            document["extracted_text"] = extraction["text"]
+            if extraction["ok"]:
+                # Error messages stand in for the text of a failed extraction; they
+                # must not end up in the retrieval index.
+                token_usage.append(extraction["usage"])
+                indexed_sources.append((original_filename, extraction["text"]))
+            if is_image:
+                with timer.stage("image_forensics"):
+                    forensics = await asyncio.to_thread(aws_service.analyze_image_forensics, s3_key)
+                # Reverse search only reads the cache here; misses are searched in the
+                # background (enrichment_worker.py) so the claim never waits on the CSE quota.
+                with timer.stage("reverse_image_search"):
+                    image_hash = await asyncio.to_thread(aws_service.get_object_etag, s3_key)
+                    reverse_search = await cached_reverse_search(get_db_collection("reverse_search_cache"), image_hash)
+                if reverse_search is None and not reverse_search_configured():
+                    reverse_search = dict(NOT_CONFIGURED_REVERSE_SEARCH)
+                elif reverse_search is None:
+                    reverse_search = dict(PENDING_REVERSE_SEARCH)
+                    deferred_searches.append((s3_key, image_hash))
+                with timer.stage("image_metadata"):
+                    metadata = await asyncio.to_thread(aws_service.extract_image_metadata, s3_key)
+                images_for_analysis.append({"filename": original_filename, "results": forensics, "reverse_search": reverse_search, "metadata": metadata})
+                image_entities = extract_entities(forensics, metadata, reverse_search)
+                entity_keys.extend(k for k in image_entities if k not in entity_keys)
+                document.update(image_analysis_results=forensics, reverse_image_search_results=reverse_search, image_metadata=metadata, entity_keys=image_entities)
+            document["analysis_status"] = "completed"
+        except Exception as e:
+            texts_for_analysis.append(f"Analysis failed for file {original_filename}: {e}")
+            document["analysis_status"] = "failed"
+        # Same record the upload Lambda writes, so the enrichment worker can merge
+        # search results into it and re-synthesize from it later. Large fields go
+        # to the blob store so the documents collection stays small.
+        document_fields = await asyncio.to_thread(offload_fields, claim_id, document)
+        await documents_collection.update_one({"claim_id": claim_id, "s3_key": s3_key}, {"$set": document_fields, "$setOnInsert": {"upload_timestamp": datetime.utcnow()}}, upsert=True)
+
+    try:
+        # The rewrite above may have superseded blobs of an earlier run.
+        documents = await documents_collection.find({"claim_id": claim_id}, {"blob_refs": 1}).to_list(length=None)
+        await asyncio.to_thread(prune_blobs, claim_id, documents)
+    except Exception as e:
+        print(f"WARNING: Could not prune superseded blobs for claim {claim_id}. Reason: {e}")
+
+    with timer.stage("entity_index"):
+        entity_collection = get_db_collection("entity_index")
+        if entity_keys:
+            await entity_collection.bulk_write(build_index_operations(claim_id, entity_keys), ordered=False)
+        cross_claim_links = await find_linked_claims(entity_collection, claim_id, entity_keys)
+
+    # Pre-screen locally first: the provisional score is visible to the adjuster
+    # straight away and decides the claim's place in the synthesis queue.
+    with timer.stage("prescreen"):
+        screening = prescreen(extract_features(images_for_analysis, reference_date(claim), cross_claim_links))
+    await get_db_collection("claims").update_one({"id": claim_id}, {"$set": {"prescreen": screening, "provisional_risk_score": screening["score"], "updated_at": datetime.utcnow()}})
+    if deferred_searches:
+        # Riskier claims get their share of the search quota first.
+        jobs_collection = get_db_collection("enrichment_jobs")
+        for s3_key, image_hash in deferred_searches:
+            await jobs_collection.update_one(*enqueue_operation(REVERSE_SEARCH, claim_id, s3_key, image_hash, priority=screening["score"]), upsert=True)
+
+    adjuster_notes = claim.get('additional_info')
+    if should_skip_synthesis(screening) and not full_synthesis:
+        final_report = prescreen_report(screening)
+    else:
+        with timer.stage("synthesis"):
+            final_report = await analyze_claim_bundle(texts_for_analysis, images_for_analysis, [], adjuster_notes, cross_claim_links, priority=screening["score"])
+
+    context_content = render_q_context(claim_id, final_report, texts_for_analysis)
+    context_s3_key = f"claims_context/{claim_id}.txt"
+    try:
+        with timer.stage("context_upload"):
+            await asyncio.to_thread(aws_service.s3_client.put_object, Bucket=settings.Q_DATASOURCE_BUCKET_NAME, Key=context_s3_key, Body=context_content.encode('utf-8'))
+    except Exception as e:
+        print(f"ERROR: Could not upload context file for Amazon Q. Reason: {e}")
+
+    try:
+        with timer.stage("retrieval_index"):
+            retrieval_index = await asyncio.to_thread(build_index, indexed_sources)
+            await asyncio.to_thread(index_store.save, claim_id, retrieval_index)
+    except Exception as e:
+        print(f"ERROR: Could not build retrieval index for claim {claim_id}. Reason: {e}")
+
+    # Read as late as possible: abandoned hedge calls add their usage when they return.
+    token_usage.extend(final_report.get("usage", []))
+    update_data = {"summary": final_report.get("summary"), "fraud_risk_score": final_report.get("fraud_risk_score"), "key_risk_factors": final_report.get("key_risk_factors"), "status": "ready_for_review", "stage_timings": timer.timings, "token_usage": token_usage, "analysis_completed_at": datetime.utcnow(), "updated_at": datetime.utcnow()}
+    return update_data, entity_keys
+
+
+class AnalysisRuns:
+    """
+    Single-flight claim analysis. A run starts only after atomically taking the
+    claim's `analysis_lease` (a run ID with an expiry that the run keeps renewing),
+    so concurrent triggers from double clicks, retries or a second tab cannot
+    start a second pipeline. They attach to the run in flight instead: through
+    its task in this process, or by polling the lease when another worker
+    process owns it. The result is written only while the lease is still held,
+    so a run whose lease expired can never overwrite a newer one.
+
+    A retried request carrying the same Idempotency-Key as the last completed
+    run gets that run's result back without analysing the claim again.
+    """
+
+    def __init__(self, lease_seconds: float, poll_interval: float):
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._runs: Dict[str, asyncio.Task] = {}
+
+    async def trigger(self, claims_collection, claim_id: str, adjuster_id: str, full_synthesis: bool = False, idempotency_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Returns the analysed claim, or None if the adjuster has no such claim."""
+        while True:
+            claim = await claims_collection.find_one({"id": claim_id, "adjuster_id": adjuster_id})
+            if not claim:
+                return None
+            lease = claim.get("analysis_lease")
+            if lease and lease["expires_at"] > datetime.utcnow():
+                attached = await self._attach(claims_collection, claim_id, adjuster_id, lease["run_id"])
+                if attached is not None:
+                    return attached
+                continue  # the claim is gone, or its owner stopped renewing the lease; look again
+            if idempotency_key and not lease and claim.get("analysis_idempotency_key") == idempotency_key:
+                return claim
+
+            run_id = uuid.uuid4().hex
+            now = datetime.utcnow()
+            acquired = await claims_collection.find_one_and_update(
+                {"id": claim_id, "$or": [{"analysis_lease": None}, {"analysis_lease.expires_at": {"$lte": now}}]},
+                {"$set": {
+                    "status": "analyzing",
+                    "analysis_lease": {"run_id": run_id, "started_at": now, "expires_at": now + timedelta(seconds=self.lease_seconds)},
+                    "updated_at": now,
+                }},
+            )
+            if acquired is None:
+                continue  # another trigger won the race; attach to its run
+            analytics_rollups.mark_dirty(adjuster_id)
+            task = asyncio.create_task(self._run(claims_collection, claim, run_id, full_synthesis, idempotency_key))
+            self._runs[run_id] = task
+            task.add_done_callback(lambda _: self._runs.pop(run_id, None))
+            # Shielded, so a client disconnecting does not abort the run for everyone attached to it.
+            return await asyncio.shield(task)
+
+    async def _attach(self, claims_collection, claim_id: str, adjuster_id: str, run_id: str) -> Optional[Dict[str, Any]]:
+        """Waits for a run to finish and returns the claim, or None if the claim is gone or the lease expired first."""
+        task = self._runs.get(run_id)
+        if task is not None:
+            return await asyncio.shield(task)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            claim = await claims_collection.find_one({"id": claim_id, "adjuster_id": adjuster_id})
+            if claim is None:
+                return None
+            lease = claim.get("analysis_lease")
+            if not lease or lease["run_id"] != run_id:
+                return claim
+            if lease["expires_at"] <= datetime.utcnow():
+                return None
+
+    async def _renew(self, claims_collection, claim_id: str, run_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            result = await claims_collection.update_one(
+                {"id": claim_id, "analysis_lease.run_id": run_id},
+                {"$set": {"analysis_lease.expires_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+            )
+            if result.matched_count == 0:
+                return
+
+    async def _run(self, claims_collection, claim: Dict[str, Any], run_id: str, full_synthesis: bool, idempotency_key: Optional[str]) -> Dict[str, Any]:
+        claim_id = claim["id"]
+        held = {"id": claim_id, "analysis_lease.run_id": run_id}
+        renewal = asyncio.create_task(self._renew(claims_collection, claim_id, run_id))
+        try:
+            update_data, entity_keys = await run_analysis_pipeline(claim, full_synthesis)
+            update_data["analysis_idempotency_key"] = idempotency_key
+            # Entity keys are added rather than replaced: the enrichment worker may already
+            # have added URL entities from a finished reverse search.
+            result = await claims_collection.update_one(held, {"$set": update_data, "$addToSet": {"entity_keys": {"$each": entity_keys}}, "$unset": {"analysis_lease": ""}})
+            if result.matched_count == 0:
+                print(f"WARNING: Analysis run {run_id} for claim {claim_id} lost its lease; its result was discarded.")
+        except BaseException:
+            await claims_collection.update_one(held, {"$set": {"status": claim.get("status"), "updated_at": datetime.utcnow()}, "$unset": {"analysis_lease": ""}})
+            raise
+        finally:
+            renewal.cancel()
+            analytics_rollups.mark_dirty(claim.get("adjuster_id"))
+        return await claims_collection.find_one({"id": claim_id})
+
+
+analysis_runs = AnalysisRuns(lease_seconds=settings.ANALYSIS_LEASE_SECONDS, poll_interval=settings.ANALYSIS_ATTACH_POLL_SECONDS)
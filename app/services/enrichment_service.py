@@ -0,0 +1,270 @@
+# app/services/enrichment_service.py
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.core.metrics import OPERATION_ERRORS, record
+from app.services.aws_service import aws_service
+from app.services.analysis_service import analyze_claim_bundle, render_q_context
+from app.services.analytics_service import analytics_rollups
+from app.services.blob_service import load_fields
+from app.services.entity_service import build_index_operations, extract_entities, find_linked_claims
+from app.services.prescreen_service import extract_features, prescreen, reference_date
+
+# Background enrichment: reverse image search is slow and the Custom Search quota
+# is tiny, so the analysis pipeline only consults the cache and queues a job. The
+# worker (enrichment_worker.py) spends the quota highest-risk claim first, merges
+# results into the document records and re-synthesizes a claim when a match turns up.
+
+REVERSE_SEARCH = "reverse_search"
+RESYNTHESIS = "resynthesis"
+
+PENDING_REVERSE_SEARCH = {"match_found": False, "urls": [], "search_status": "pending"}
+# Stored straight away when Custom Search is not configured: queueing would only
+# leave the document pending forever, or burn every retry on the same answer.
+NOT_CONFIGURED_REVERSE_SEARCH = {"match_found": False, "urls": [], "search_status": "API keys not configured."}
+
+
+def reverse_search_configured() -> bool:
+    return aws_service.google_search_service is not None
+
+
+# --- Cache (keyed by image hash, i.e. the S3 ETag) ---
+
+async def cached_reverse_search(cache_collection, image_hash: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not image_hash:
+        return None
+    entry = await cache_collection.find_one({"_id": image_hash})
+    return entry["result"] if entry else None
+
+
+def cache_operation(image_hash: str, result: Dict[str, Any]) -> Tuple[Dict, Dict]:
+    now = datetime.utcnow()
+    return {"_id": image_hash}, {"$set": {"result": result, "cached_at": now, "expires_at": now + timedelta(days=settings.REVERSE_SEARCH_CACHE_TTL_DAYS)}}
+
+
+# --- Job Queue ---
+
+def enqueue_operation(job_type: str, claim_id: str, s3_key: Optional[str] = None, image_hash: Optional[str] = None, priority: float = 0.0, delay_seconds: float = 0.0) -> Tuple[Dict, Dict]:
+    """
+    Filter and update for an idempotent upsert into `enrichment_jobs`, usable with
+    both Motor and PyMongo. A repeated reverse search request only raises the
+    job's priority; a repeated re-synthesis request re-arms the job.
+    """
+    now = datetime.utcnow()
+    job_filter = {"type": job_type, "claim_id": claim_id, "s3_key": s3_key}
+    update: Dict[str, Any] = {"$max": {"priority": priority}}
+    on_insert = {"image_hash": image_hash, "created_at": now}
+    queued = {"status": "queued", "attempts": 0, "not_before": now + timedelta(seconds=delay_seconds)}
+    if job_type == RESYNTHESIS:
+        update["$set"] = queued
+    else:
+        on_insert.update(queued)
+    update["$setOnInsert"] = on_insert
+    return job_filter, update
+
+
+async def ensure_indexes(jobs_collection, cache_collection, quota_collection) -> None:
+    await jobs_collection.create_index([("type", 1), ("claim_id", 1), ("s3_key", 1)], unique=True)
+    await jobs_collection.create_index([("status", 1), ("priority", -1), ("created_at", 1)])
+    await cache_collection.create_index("expires_at", expireAfterSeconds=0)
+    await quota_collection.create_index("expires_at", expireAfterSeconds=0)
+
+
+async def claim_next_job(jobs_collection) -> Optional[Dict[str, Any]]:
+    """Atomically leases the highest-priority due job; expired leases from crashed workers are picked up again."""
+    now = datetime.utcnow()
+    return await jobs_collection.find_one_and_update(
+        {"$or": [
+            {"status": "queued", "not_before": {"$lte": now}},
+            {"status": "running", "lease_expires_at": {"$lte": now}},
+        ]},
+        {"$set": {"status": "running", "lease_expires_at": now + timedelta(seconds=settings.ENRICHMENT_LEASE_SECONDS)}, "$inc": {"attempts": 1}},
+        sort=[("priority", -1), ("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def finish_job(jobs_collection, job: Dict[str, Any], status: str = "done", **fields) -> None:
+    await jobs_collection.update_one({"_id": job["_id"]}, {"$set": dict(fields, status=status, finished_at=datetime.utcnow())})
+
+
+async def defer_job(jobs_collection, job: Dict[str, Any], until: datetime, count_attempt: bool = False) -> None:
+    """Puts a job back in the queue; waiting for quota does not count as an attempt."""
+    update: Dict[str, Any] = {"$set": {"status": "queued", "not_before": until}}
+    if not count_attempt:
+        update["$inc"] = {"attempts": -1}
+    await jobs_collection.update_one({"_id": job["_id"]}, update)
+
+
+# --- Quota ---
+
+def _quota_windows(now: datetime) -> List[Tuple[str, int, datetime]]:
+    next_minute = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    next_day = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return [
+        (f"reverse_search:day:{now:%Y-%m-%d}", settings.REVERSE_SEARCH_DAILY_QUOTA, next_day),
+        (f"reverse_search:minute:{now:%Y-%m-%dT%H:%M}", settings.REVERSE_SEARCH_PER_MINUTE_QUOTA, next_minute),
+    ]
+
+
+async def acquire_quota(quota_collection) -> Optional[datetime]:
+    """
+    Takes one search from both the daily and the per-minute budget, shared by all
+    workers. Returns None on success, or when to try again if a budget is spent.
+
+    Each window is a counter document. The conditional upsert only matches while
+    the counter is under its limit; once it is not, the upsert tries to insert a
+    second document with the same _id and fails with a duplicate key error, which
+    is how an exhausted budget is detected atomically.
+    """
+    taken = []
+    for key, limit, resets_at in _quota_windows(datetime.utcnow()):
+        if not await _take_from_window(quota_collection, key, limit, resets_at):
+            for taken_key in taken:
+                await quota_collection.update_one({"_id": taken_key}, {"$inc": {"used": -1}})
+            return resets_at
+        taken.append(key)
+    return None
+
+
+async def _take_from_window(quota_collection, key: str, limit: int, resets_at: datetime) -> bool:
+    if limit <= 0:
+        return False
+    # Two workers opening a new window at the same time both try to insert it, and
+    # the loser gets a duplicate key error without the budget being spent. Retrying
+    # once tells the cases apart: the retry matches the winner's counter unless it
+    # is really at its limit.
+    for attempt in range(2):
+        try:
+            await quota_collection.find_one_and_update(
+                {"_id": key, "used": {"$lt": limit}},
+                {"$inc": {"used": 1}, "$setOnInsert": {"expires_at": resets_at + timedelta(days=1)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            if attempt:
+                return False
+
+
+# --- Job Handlers ---
+
+async def run_reverse_search(job: Dict[str, Any], collections: Dict[str, Any]) -> Optional[datetime]:
+    """
+    Runs one reverse search job. Returns when to retry if the quota is spent,
+    otherwise None once the job is finished.
+    """
+    result = await cached_reverse_search(collections["cache"], job.get("image_hash"))
+    if result is None and not reverse_search_configured():
+        # Queued before search was switched off, or by a host that had the keys.
+        result = dict(NOT_CONFIGURED_REVERSE_SEARCH)
+    elif result is None:
+        retry_at = await acquire_quota(collections["quota"])
+        if retry_at is not None:
+            await defer_job(collections["jobs"], job, retry_at)
+            return retry_at
+        result = await asyncio.to_thread(aws_service.reverse_image_search, job["s3_key"])
+        if result.get("search_status") != "completed":
+            # API errors (rate limiting, outages) are retried with a growing delay.
+            if job["attempts"] < settings.ENRICHMENT_MAX_ATTEMPTS:
+                await defer_job(collections["jobs"], job, datetime.utcnow() + timedelta(minutes=2 ** job["attempts"]), count_attempt=True)
+            else:
+                await finish_job(collections["jobs"], job, status="failed", error=result.get("search_status"))
+            return None
+        if job.get("image_hash"):
+            await collections["cache"].update_one(*cache_operation(job["image_hash"], result), upsert=True)
+
+    await collections["documents"].update_many({"claim_id": job["claim_id"], "s3_key": job["s3_key"]}, {"$set": {"reverse_image_search_results": result}})
+    if result.get("match_found"):
+        keys = extract_entities(None, None, result)
+        if keys:
+            await collections["entity_index"].bulk_write(build_index_operations(job["claim_id"], keys), ordered=False)
+            # updated_at moves with the keys, since the claim's ETag is derived from it.
+            await collections["claims"].update_one({"id": job["claim_id"]}, {"$addToSet": {"entity_keys": {"$each": keys}}, "$set": {"updated_at": datetime.utcnow()}})
+        # A match changes the picture; nothing found leaves the report as it is.
+        await collections["jobs"].update_one(*enqueue_operation(RESYNTHESIS, job["claim_id"], priority=job.get("priority", 0.0)), upsert=True)
+    await finish_job(collections["jobs"], job, match_found=result.get("match_found", False))
+    return None
+
+
+async def run_resynthesis(job: Dict[str, Any], collections: Dict[str, Any]) -> None:
+    """Re-runs synthesis for a claim from its stored document records, now including the new match."""
+    claim = await collections["claims"].find_one({"id": job["claim_id"]})
+    if claim is None:
+        await finish_job(collections["jobs"], job, status="failed", error="claim not found")
+        return
+    if claim.get("status") == "analyzing" or claim.get("analysis_lease"):
+        # The pipeline is still running and will overwrite the report; come back later.
+        await defer_job(collections["jobs"], job, datetime.utcnow() + timedelta(seconds=settings.ENRICHMENT_LEASE_SECONDS))
+        return
+
+    texts, images = [], []
+    async for document in collections["documents"].find({"claim_id": claim["id"]}):
+        document = await asyncio.to_thread(load_fields, document, ("extracted_text", "image_analysis_results"))
+        texts.append(document.get("extracted_text") or "")
+        if document.get("image_analysis_results") is not None:
+            images.append({
+                "filename": document.get("original_filename"),
+                "results": document.get("image_analysis_results"),
+                "reverse_search": document.get("reverse_image_search_results"),
+                "metadata": document.get("image_metadata"),
+            })
+    links = await find_linked_claims(collections["entity_index"], claim["id"], claim.get("entity_keys", []))
+    screening = prescreen(extract_features(images, reference_date(claim), links))
+    report = await analyze_claim_bundle(texts, images, [], claim.get("additional_info"), links, priority=screening["score"])
+    if report.get("fraud_risk_score") == -1:
+        if report.get("usage"):
+            await collections["claims"].update_one({"id": claim["id"]}, {"$push": {"token_usage": {"$each": report["usage"]}}, "$set": {"updated_at": datetime.utcnow()}})
+        if job["attempts"] < settings.ENRICHMENT_MAX_ATTEMPTS:
+            await defer_job(collections["jobs"], job, datetime.utcnow() + timedelta(minutes=2 ** job["attempts"]), count_attempt=True)
+        else:
+            await finish_job(collections["jobs"], job, status="failed", error="synthesis failed")
+        return
+
+    # Only written while no analysis run holds the claim, so a re-synthesis never
+    # overwrites the report of a run that started in the meantime.
+    result = await collections["claims"].update_one({"id": claim["id"], "analysis_lease": None}, {
+        "$set": {
+            "summary": report.get("summary"), "fraud_risk_score": report.get("fraud_risk_score"), "key_risk_factors": report.get("key_risk_factors"),
+            "prescreen": screening, "provisional_risk_score": screening["score"], "updated_at": datetime.utcnow(),
+        },
+        "$push": {"token_usage": {"$each": report.get("usage", [])}},
+    })
+    if result.matched_count == 0:
+        await defer_job(collections["jobs"], job, datetime.utcnow() + timedelta(seconds=settings.ENRICHMENT_LEASE_SECONDS))
+        return
+    analytics_rollups.mark_dirty(claim.get("adjuster_id"))
+    try:
+        context = render_q_context(claim["id"], report, texts)
+        await asyncio.to_thread(aws_service.s3_client.put_object, Bucket=settings.Q_DATASOURCE_BUCKET_NAME, Key=f"claims_context/{claim['id']}.txt", Body=context.encode("utf-8"))
+    except Exception as e:
+        print(f"ERROR: Could not refresh context file for claim {claim['id']}. Reason: {e}")
+    await finish_job(collections["jobs"], job, fraud_risk_score=report.get("fraud_risk_score"))
+
+
+HANDLERS = {REVERSE_SEARCH: run_reverse_search, RESYNTHESIS: run_resynthesis}
+
+
+async def process_next_job(collections: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Leases and runs one job. Returns the job, or None when the queue has nothing due."""
+    job = await claim_next_job(collections["jobs"])
+    if job is None:
+        return None
+    started = datetime.utcnow()
+    try:
+        await HANDLERS[job["type"]](job, collections)
+    except Exception as e:
+        OPERATION_ERRORS.labels("enrichment", job["type"], type(e).__name__).inc()
+        print(f"ERROR: Enrichment job {job['_id']} ({job['type']}) failed. Reason: {e}")
+        if job["attempts"] < settings.ENRICHMENT_MAX_ATTEMPTS:
+            await defer_job(collections["jobs"], job, datetime.utcnow() + timedelta(minutes=2 ** job["attempts"]), count_attempt=True)
+        else:
+            await finish_job(collections["jobs"], job, status="failed", error=str(e))
+    record("enrichment", job["type"], (datetime.utcnow() - started).total_seconds())
+    return job
@@ -0,0 +1,121 @@
+# app/services/entity_service.py
+
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from pymongo import UpdateOne
+
+from app.core.config import settings
+
+# Entity keys are "<type>:<normalized value>", e.g. "plate:KJA123XY".
+ENTITY_TYPES = ("plate", "device", "gps", "url")
+
+# A licence plate candidate: 5-8 letters and digits, containing at least one of each.
+PLATE_RE = re.compile(r"^(?=.*[A-Z])(?=.*\d)[A-Z0-9]{5,8}$")
+
+
+def normalize(entity_type: str, value: Any) -> Optional[str]:
+    """Normalizes a raw value so the same real-world entity always maps to the same key."""
+    if value is None:
+        return None
+    if entity_type == "plate":
+        candidate = re.sub(r"[\s\-\.]", "", str(value).upper())
+        return candidate if PLATE_RE.match(candidate) else None
+    if entity_type == "device":
+        candidate = " ".join(str(value).upper().split())
+        return candidate or None
+    if entity_type == "gps":
+        # ~110 m grid, so photos of the same scene collide but a whole city does not.
+        if isinstance(value, dict):
+            value = f"{value.get('latitude')},{value.get('longitude')}"
+        try:
+            lat, lon = (float(part) for part in str(value).split(","))
+        except ValueError:
+            return None
+        return f"{round(lat, 3)},{round(lon, 3)}"
+    if entity_type == "url":
+        parts = urlsplit(str(value).strip())
+        if not parts.netloc:
+            return None
+        return f"{parts.netloc.lower()}{parts.path.rstrip('/')}"
+    return None
+
+
+def entity_key(entity_type: str, value: Any) -> Optional[str]:
+    normalized = normalize(entity_type, value)
+    return f"{entity_type}:{normalized}" if normalized else None
+
+
+def extract_entities(forensics: Optional[Dict], metadata: Optional[Dict], reverse_search: Optional[Dict]) -> List[str]:
+    """
+    Pulls comparable entities out of one image's analysis results: licence plates
+    from detected text, the camera model, GPS position and reverse-search hits.
+    """
+    candidates = []
+    for line in (forensics or {}).get("detected_text", []):
+        candidates.append(("plate", line))
+        candidates.extend(("plate", word) for word in line.split())
+    candidates.append(("device", (metadata or {}).get("camera_model")))
+    candidates.append(("gps", (metadata or {}).get("gps_info")))
+    candidates.extend(("url", url) for url in (reverse_search or {}).get("urls", []))
+
+    keys = []
+    for entity_type, value in candidates:
+        key = entity_key(entity_type, value)
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def build_index_operations(claim_id: str, keys: List[str]) -> List[UpdateOne]:
+    """
+    Upserts that add the claim to each entity's posting list. The same operations
+    work with both Motor's and PyMongo's `bulk_write`, so the API and the Lambda
+    handlers keep the index up to date incrementally as documents complete.
+
+    A posting list stops growing at ENTITY_COMMON_THRESHOLD + 2 claims: from
+    there on the entity counts as too common for every claim, listed or not
+    (see `linked_claims_from_entries`), so more IDs would never be reported.
+    """
+    now = datetime.utcnow()
+    limit = settings.ENTITY_COMMON_THRESHOLD + 2
+    claim_ids = {"$ifNull": ["$claim_ids", []]}
+    # An update pipeline, so the membership and size checks and the append are one atomic upsert.
+    appended = {"$cond": [
+        {"$or": [{"$in": [{"$literal": claim_id}, claim_ids]}, {"$gte": [{"$size": claim_ids}, limit]}]},
+        claim_ids,
+        {"$concatArrays": [claim_ids, {"$literal": [claim_id]}]},
+    ]}
+    operations = []
+    for key in keys:
+        entity_type, value = key.split(":", 1)
+        operations.append(UpdateOne(
+            {"_id": key},
+            [{"$set": {"type": {"$literal": entity_type}, "value": {"$literal": value}, "updated_at": {"$literal": now}, "claim_ids": appended}}],
+            upsert=True,
+        ))
+    return operations
+
+
+def linked_claims_from_entries(claim_id: str, entries: List[Dict]) -> List[Dict[str, Any]]:
+    """
+    Turns entity index entries into links to *other* claims. Entities shared by a
+    very large number of claims (a popular phone model, say) carry no signal and
+    are left out.
+    """
+    links = []
+    for entry in entries:
+        others = [c for c in entry.get("claim_ids", []) if c != claim_id]
+        if not others or len(others) > settings.ENTITY_COMMON_THRESHOLD:
+            continue
+        links.append({"entity": entry["_id"], "type": entry["type"], "value": entry["value"], "claim_ids": others})
+    return links
+
+
+async def find_linked_claims(entity_collection, claim_id: str, keys: List[str]) -> List[Dict[str, Any]]:
+    if not keys:
+        return []
+    entries = await entity_collection.find({"_id": {"$in": keys}}).to_list(length=None)
+    return linked_claims_from_entries(claim_id, entries)
@@ -0,0 +1,112 @@
+# app/services/payload_service.py
+
+import base64
+import json
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Tuple
+
+from app.core.config import settings
+from app.core.metrics import PAYLOAD_MEMORY_RESERVED, record
+
+# Placeholder swapped for the streamed base64 data once the rest of the request
+# body has been serialized. It can never occur in real JSON output.
+DATA_PLACEHOLDER = "\x00veritas-payload-data\x00"
+
+
+class MemoryBudget:
+    """
+    A per-process byte semaphore for large request payloads. Work that would take
+    the process over its budget waits for earlier payloads to be released rather
+    than letting the worker be OOM-killed. A single request larger than the whole
+    budget is still allowed through, but only on its own.
+
+    Waiting blocks the calling thread, so async code must reach it through
+    `asyncio.to_thread` rather than on the event loop.
+    """
+
+    def __init__(self, limit_bytes: int):
+        self.limit_bytes = limit_bytes
+        self.reserved = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes: int):
+        nbytes = min(nbytes, self.limit_bytes)
+        started = time.perf_counter()
+        with self._condition:
+            while self.reserved + nbytes > self.limit_bytes:
+                self._condition.wait()
+            self.reserved += nbytes
+            PAYLOAD_MEMORY_RESERVED.set(self.reserved)
+        record("payload", "memory_wait", time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.reserved -= nbytes
+                PAYLOAD_MEMORY_RESERVED.set(self.reserved)
+                self._condition.notify_all()
+
+
+def encoded_length(raw_length: int) -> int:
+    return 4 * ((raw_length + 2) // 3)
+
+
+def write_base64(source: BinaryIO, target: BinaryIO, chunk_bytes: int) -> int:
+    """
+    Base64-encodes `source` into `target` incrementally and returns the number of
+    bytes written. Input is encoded in multiples of 3 bytes so the chunks join
+    without padding; the remainder is carried over to the next read.
+    """
+    chunk_bytes = max(3, chunk_bytes - chunk_bytes % 3)
+    carry = b""
+    written = 0
+    while True:
+        chunk = source.read(chunk_bytes)
+        if not chunk:
+            break
+        view = memoryview(carry + chunk) if carry else memoryview(chunk)
+        usable = len(view) - len(view) % 3
+        encoded = base64.b64encode(view[:usable])
+        target.write(encoded)
+        written += len(encoded)
+        carry = bytes(view[usable:])
+    if carry:
+        encoded = base64.b64encode(carry)
+        target.write(encoded)
+        written += len(encoded)
+    return written
+
+
+def split_around_data(body: Dict[str, Any]) -> Tuple[bytes, bytes]:
+    """Serializes a request body whose one `data` field is the placeholder, returning the JSON on either side of it."""
+    prefix, suffix = json.dumps(body).split(json.dumps(DATA_PLACEHOLDER))
+    return (prefix + '"').encode("utf-8"), ('"' + suffix).encode("utf-8")
+
+
+def build_document_payload(source: BinaryIO, body: Dict[str, Any]) -> Tuple[BinaryIO, int]:
+    """
+    Builds a JSON request body embedding `source` as base64 without ever holding
+    the raw file, its encoding or the serialized JSON in memory as whole copies.
+    The body is written to a spooled temporary file that stays in memory up to
+    PAYLOAD_SPOOL_MAX_BYTES and rolls over to disk beyond that; the caller
+    passes the returned file straight to boto3 and closes it afterwards.
+    """
+    prefix, suffix = split_around_data(body)
+    payload = tempfile.SpooledTemporaryFile(max_size=settings.PAYLOAD_SPOOL_MAX_BYTES)
+    payload.write(prefix)
+    length = len(prefix) + write_base64(source, payload, settings.PAYLOAD_CHUNK_BYTES)
+    payload.write(suffix)
+    payload.seek(0)
+    return payload, length + len(suffix)
+
+
+def payload_reservation(raw_length: int) -> int:
+    """Peak memory to reserve for a payload: the in-memory part of the spool plus a raw and an encoded chunk."""
+    return min(encoded_length(raw_length), settings.PAYLOAD_SPOOL_MAX_BYTES) + 2 * settings.PAYLOAD_CHUNK_BYTES
+
+
+memory_budget = MemoryBudget(limit_bytes=settings.PAYLOAD_MEMORY_BUDGET_BYTES)
@@ -0,0 +1,191 @@
+# app/services/progress_service.py
+
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.core.config import settings
+from app.db.session import db, get_db_collection
+
+# Only the fields the progress events need are pulled out of the change stream,
+# so large fields such as extracted_text never travel to the API process.
+CHANGE_STREAM_PIPELINE = [
+    {"$match": {
+        "ns.coll": {"$in": ["claims", "documents"]},
+        "operationType": {"$in": ["insert", "update", "replace"]},
+    }},
+    {"$project": {
+        "ns": 1,
+        "documentKey": 1,
+        "fullDocument.id": 1,
+        "fullDocument.claim_id": 1,
+        "fullDocument.status": 1,
+        "fullDocument.fraud_risk_score": 1,
+        "fullDocument.provisional_risk_score": 1,
+        "fullDocument.updated_at": 1,
+        "fullDocument.analysis_status": 1,
+        "fullDocument.original_filename": 1,
+    }},
+]
+
+CLAIM_PROJECTION = {"_id": 0, "id": 1, "status": 1, "fraud_risk_score": 1, "provisional_risk_score": 1, "updated_at": 1}
+DOCUMENT_PROJECTION = {"_id": 1, "claim_id": 1, "analysis_status": 1, "original_filename": 1}
+
+# Error code Mongo returns when change streams are used on a standalone server.
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+
+def claim_event(claim: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "claim",
+        "claim_id": claim.get("id"),
+        "status": claim.get("status"),
+        "fraud_risk_score": claim.get("fraud_risk_score"),
+        "provisional_risk_score": claim.get("provisional_risk_score"),
+        "updated_at": claim.get("updated_at"),
+    }
+
+
+def document_event(document: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "document",
+        "claim_id": document.get("claim_id"),
+        "document_id": str(document.get("_id")),
+        "filename": document.get("original_filename"),
+        "status": document.get("analysis_status"),
+    }
+
+
+class ClaimProgressHub:
+    """
+    Fans claim- and document-level status changes out to every subscriber in
+    this process. A single background task watches a Mongo change stream (or
+    polls, when the server is not a replica set) no matter how many clients are
+    connected, and only runs while at least one subscriber exists.
+    """
+
+    def __init__(self, poll_interval: float, queue_size: int):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.mode: Optional[str] = None
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._last_seen: Dict[Tuple[str, str], Tuple] = {}
+        self._seeded: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Subscription Management ---
+
+    def subscribe(self, claim_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[claim_id].add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, claim_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(claim_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[claim_id]
+                self._seeded.discard(claim_id)
+                self._last_seen = {k: v for k, v in self._last_seen.items() if k[0] != claim_id}
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        for queue in self._subscribers.get(event.get("claim_id"), ()):
+            if queue.full():
+                # A slow consumer only loses its oldest update, never blocks the others.
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def snapshot(self, claim_id: str) -> List[Dict[str, Any]]:
+        """Current state of a claim and its documents, sent when a client connects."""
+        claim = await get_db_collection("claims").find_one({"id": claim_id}, CLAIM_PROJECTION)
+        events = [claim_event(claim)] if claim else []
+        documents = get_db_collection("documents").find({"claim_id": claim_id}, DOCUMENT_PROJECTION)
+        events.extend([document_event(d) async for d in documents])
+        # Seed the polling baseline so only changes after this point are pushed.
+        for event in events:
+            self._changed(event)
+        self._seeded.add(claim_id)
+        return events
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # --- Sources ---
+
+    async def _run(self) -> None:
+        try:
+            await self._watch()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Standalone servers (and in-memory stand-ins) cannot open change streams.
+            if not (isinstance(e, OperationFailure) and e.code == CHANGE_STREAMS_UNSUPPORTED):
+                print(f"WARNING: Change stream unavailable, falling back to polling. Reason: {e}")
+            await self._poll()
+
+    async def _watch(self) -> None:
+        resume_token = None
+        while True:
+            try:
+                async with db.db.watch(CHANGE_STREAM_PIPELINE, full_document="updateLookup", resume_after=resume_token) as stream:
+                    self.mode = "change_stream"
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        document = change.get("fullDocument")
+                        if not document:
+                            continue
+                        if change["ns"]["coll"] == "claims":
+                            self.publish(claim_event(document))
+                        else:
+                            self.publish(document_event(dict(document, _id=change["documentKey"]["_id"])))
+            except OperationFailure:
+                raise
+            except PyMongoError as e:
+                # Transient network or election errors: reconnect and resume where we left off.
+                print(f"WARNING: Change stream interrupted, resuming. Reason: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _poll(self) -> None:
+        self.mode = "polling"
+        claims = get_db_collection("claims")
+        documents = get_db_collection("documents")
+        while True:
+            # Claims whose snapshot is still being taken are skipped until it is done.
+            claim_ids = [claim_id for claim_id in self._subscribers if claim_id in self._seeded]
+            if claim_ids:
+                async for claim in claims.find({"id": {"$in": claim_ids}}, CLAIM_PROJECTION):
+                    self._publish_if_changed(claim_event(claim))
+                async for document in documents.find({"claim_id": {"$in": claim_ids}}, DOCUMENT_PROJECTION):
+                    self._publish_if_changed(document_event(document))
+            await asyncio.sleep(self.poll_interval)
+
+    def _publish_if_changed(self, event: Dict[str, Any]) -> None:
+        if self._changed(event):
+            self.publish(event)
+
+    def _changed(self, event: Dict[str, Any]) -> bool:
+        key = (event["claim_id"], event.get("document_id") or "claim")
+        signature = tuple(sorted((k, str(v)) for k, v in event.items()))
+        changed = self._last_seen.get(key) != signature
+        self._last_seen[key] = signature
+        return changed
+
+
+progress_hub = ClaimProgressHub(
+    poll_interval=settings.PROGRESS_POLL_INTERVAL_SECONDS,
+    queue_size=settings.PROGRESS_QUEUE_SIZE,
+)
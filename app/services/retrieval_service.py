@@ -0,0 +1,158 @@
+# app/services/retrieval_service.py
+
+import gzip
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from app.core.config import settings
+from app.core.metrics import instrument
+from app.services.aws_service import aws_service
+
+INDEX_VERSION = 1
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with",
+}
+
+# Standard BM25 parameters.
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_text(text: str, chunk_words: int, overlap: int) -> List[str]:
+    """Splits text into overlapping windows of roughly `chunk_words` words."""
+    words = text.split()
+    if not words:
+        return []
+    step = max(1, chunk_words - overlap)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+def build_index(sources: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """
+    Builds a BM25 inverted index over (source name, text) pairs. The result is
+    plain JSON-serializable data so it can be persisted and reloaded as-is.
+    """
+    chunks, lengths = [], []
+    postings: Dict[str, List[List[int]]] = {}
+    for source, text in sources:
+        for chunk in chunk_text(text, settings.RETRIEVAL_CHUNK_WORDS, settings.RETRIEVAL_CHUNK_OVERLAP):
+            chunk_id = len(chunks)
+            tokens = tokenize(chunk)
+            chunks.append({"source": source, "text": chunk})
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append([chunk_id, tf])
+    return {
+        "version": INDEX_VERSION,
+        "chunks": chunks,
+        "lengths": lengths,
+        "avgdl": (sum(lengths) / len(lengths)) if lengths else 0.0,
+        "postings": postings,
+    }
+
+
+def search(index: Dict[str, Any], query: str, top_k: int) -> List[Dict[str, Any]]:
+    """Returns the `top_k` highest-scoring chunks for the query, best first."""
+    n = len(index["chunks"])
+    if not n:
+        return []
+    lengths, avgdl = index["lengths"], index["avgdl"] or 1.0
+    scores: Dict[int, float] = {}
+    for term in set(tokenize(query)):
+        postings = index["postings"].get(term)
+        if not postings:
+            continue
+        idf = math.log((n - len(postings) + 0.5) / (len(postings) + 0.5) + 1)
+        for chunk_id, tf in postings:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[chunk_id] / avgdl)
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+    best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+    return [dict(index["chunks"][chunk_id], score=round(score, 4)) for chunk_id, score in best]
+
+
+def format_query_with_passages(query: str, passages: List[Dict[str, Any]]) -> str:
+    """Builds the co-pilot message: the most relevant case file passages, then the question."""
+    if not passages:
+        return query
+    excerpts = "\n\n".join(f"[{i}] ({p['source']})\n{p['text']}" for i, p in enumerate(passages, start=1))
+    return (
+        "Relevant excerpts from the case file:\n"
+        f"{excerpts}\n\n"
+        "Using these excerpts and the case summary you already have, answer the question.\n"
+        f"Question: {query}"
+    )
+
+
+class RetrievalIndexStore:
+    """
+    Persists per-claim indexes to S3 as gzipped JSON and keeps recently used ones
+    in a small in-process LRU cache, so follow-up questions do not re-download them.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._cache: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(claim_id: str) -> str:
+        return f"claims_index/{claim_id}.json.gz"
+
+    def _remember(self, claim_id: str, index: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._cache[claim_id] = (time.monotonic(), index)
+            self._cache.move_to_end(claim_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    @instrument("retrieval", "save_index")
+    def save(self, claim_id: str, index: Dict[str, Any]) -> None:
+        body = gzip.compress(json.dumps(index, separators=(",", ":")).encode("utf-8"))
+        aws_service.s3_client.put_object(Bucket=settings.S3_UPLOADS_BUCKET_NAME, Key=self._key(claim_id), Body=body, ContentType="application/gzip")
+        self._remember(claim_id, index)
+
+    @instrument("retrieval", "load_index")
+    def load(self, claim_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the claim's index, or None if the claim was analysed before indexing existed."""
+        with self._lock:
+            cached = self._cache.get(claim_id)
+            if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+                self._cache.move_to_end(claim_id)
+                return cached[1]
+        try:
+            s3_object = aws_service.s3_client.get_object(Bucket=settings.S3_UPLOADS_BUCKET_NAME, Key=self._key(claim_id))
+            index = json.loads(gzip.decompress(s3_object["Body"].read()))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+                raise
+            index = None
+        if index is not None and index.get("version") != INDEX_VERSION:
+            index = None
+        self._remember(claim_id, index)
+        return index
+
+
+index_store = RetrievalIndexStore(
+    max_entries=settings.RETRIEVAL_CACHE_SIZE,
+    ttl_seconds=settings.RETRIEVAL_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,154 @@
+# benchmarks/aws_standins.py
+
+"""
+Offline stand-ins for the AWS APIs used by the backend.
+
+Each boto3 client on an `AWSService` instance gets a `before-call` handler,
+the same hook `botocore.stub.Stubber` uses, so requests never leave the
+process. Unlike Stubber the responses are not queued in order: every call
+gets a canned response after a simulated, seeded network latency, which
+makes the stand-ins safe to use under concurrent load.
+"""
+
+import io
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from botocore.awsrequest import AWSResponse
+from botocore.response import StreamingBody
+
+# Median latency (seconds) and log-normal sigma per "service.Operation".
+DEFAULT_LATENCY: Dict[str, Tuple[float, float]] = {
+    "s3.GetObject": (0.030, 0.4),
+    "s3.PutObject": (0.040, 0.4),
+    "s3.HeadObject": (0.015, 0.3),
+    "s3.ListObjectsV2": (0.040, 0.4),
+    "s3.DeleteObjects": (0.050, 0.4),
+    "bedrock-runtime.InvokeModel": (1.200, 0.5),
+    "rekognition.DetectLabels": (0.250, 0.4),
+    "rekognition.DetectText": (0.200, 0.4),
+    "qbusiness.ChatSync": (0.900, 0.5),
+}
+
+SYNTHESIS_REPORT = {
+    "summary": "Rear-end collision at low speed; documents are internally consistent.",
+    "fraud_risk_score": 12,
+    "key_risk_factors": ["No significant red flags detected."],
+}
+
+# Smallest valid JPEG header followed by padding, so payload sizes are realistic.
+FAKE_IMAGE = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00" + b"\x00" * 200_000 + b"\xff\xd9"
+
+
+def _streaming(data: bytes) -> StreamingBody:
+    return StreamingBody(io.BytesIO(data), len(data))
+
+
+class SimulatedAWS:
+    """Installs latency-simulating canned responses on an AWSService's clients."""
+
+    def __init__(self, latency: Optional[Dict[str, Tuple[float, float]]] = None, seed: int = 42, scale: float = 1.0, fake_image: bytes = FAKE_IMAGE):
+        self.fake_image = fake_image
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.scale = scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+        self.modified: Dict[Tuple[str, str], datetime] = {}
+
+    def install(self, aws_service) -> None:
+        clients = [aws_service.s3_client, aws_service.bedrock_runtime, aws_service.q_client, aws_service.rekognition_client]
+        for client in clients:
+            client.meta.events.register_first("before-parameter-build.*.*", self._capture_params, unique_id=f"simulated-aws-params-{id(client)}")
+            client.meta.events.register("before-call.*.*", self._handle, unique_id=f"simulated-aws-{id(client)}")
+
+    def _capture_params(self, params, context, **kwargs):
+        # `before-call` only sees the serialized request, so keep the API-level
+        # parameters (Bucket, Key, ...) around in the request context.
+        context["standin_params"] = dict(params)
+
+    def _sleep(self, key: str) -> None:
+        median, sigma = self.latency.get(key, (0.020, 0.3))
+        with self._lock:
+            # random.Random is not thread-safe; draw under the lock to keep runs reproducible.
+            delay = median * self._random.lognormvariate(0, sigma)
+            self.calls[key] = self.calls.get(key, 0) + 1
+        time.sleep(delay * self.scale)
+
+    def _handle(self, model, params, context, **kwargs):
+        key = f"{model.service_model.service_name}.{model.name}"
+        self._sleep(key)
+        api_params = context.get("standin_params", {})
+        if key == "s3.GetObject" and (api_params.get("Bucket"), api_params.get("Key")) not in self.objects and not str(api_params.get("Key", "")).startswith("claims/"):
+            # Derived objects (context files, indexes, ...) only exist once the app has written them.
+            return AWSResponse(None, 404, {}, None), {"Error": {"Code": "NoSuchKey", "Message": "The specified key does not exist."}}
+        return AWSResponse(None, 200, {}, None), self._respond(key, params, api_params)
+
+    def _respond(self, key: str, params: dict, api_params: dict) -> dict:
+        location = (api_params.get("Bucket"), api_params.get("Key"))
+        if key == "s3.GetObject":
+            # Objects written by the app (e.g. Q context files) are read back;
+            # anything else is treated as an uploaded claim photo.
+            data = self.objects.get(location, self.fake_image)
+            if api_params.get("Range"):
+                start, end = api_params["Range"].split("=")[1].split("-")
+                data = data[int(start):int(end) + 1]
+            return {"Body": _streaming(data), "ContentLength": len(data)}
+        if key == "s3.PutObject":
+            body = api_params.get("Body", b"")
+            if hasattr(body, "read"):
+                body = body.read()
+            with self._lock:
+                self.objects[location] = body if isinstance(body, bytes) else str(body).encode("utf-8")
+                self.modified[location] = datetime.now(timezone.utc)
+            return {"ETag": '"d41d8cd98f00b204e9800998ecf8427e"'}
+        if key == "s3.HeadObject":
+            return {"ETag": '"d41d8cd98f00b204e9800998ecf8427e"', "ContentLength": len(self.fake_image)}
+        if key == "s3.ListObjectsV2":
+            # Only objects written by the app are listed, in a single page.
+            bucket, prefix = api_params.get("Bucket"), api_params.get("Prefix", "")
+            with self._lock:
+                contents = [
+                    {"Key": k, "Size": len(data), "LastModified": self.modified[(b, k)]}
+                    for (b, k), data in sorted(self.objects.items()) if b == bucket and k.startswith(prefix)
+                ]
+            return {"Contents": contents, "KeyCount": len(contents), "IsTruncated": False}
+        if key == "s3.DeleteObjects":
+            with self._lock:
+                for entry in api_params.get("Delete", {}).get("Objects", []):
+                    self.objects.pop((api_params.get("Bucket"), entry["Key"]), None)
+                    self.modified.pop((api_params.get("Bucket"), entry["Key"]), None)
+            return {"Deleted": []}
+        if key == "bedrock-runtime.InvokeModel":
+            body = params.get("body", b"")
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            if hasattr(body, "read"):
+                # Streamed bodies are drained in chunks, as the HTTP layer would,
+                # so memory benchmarks are not skewed by the stand-in itself.
+                head = body.read(4096)
+                body_length = len(head)
+                for chunk in iter(lambda: body.read(256 * 1024), b""):
+                    body_length += len(chunk)
+            else:
+                head, body_length = body[:4096], len(body)
+            is_extraction = b'"type": "image"' in head
+            text = "POLICE REPORT\nIncident date: 2025-09-28\nVehicle plate: KJA 123 XY" if is_extraction else json.dumps(SYNTHESIS_REPORT)
+            payload = {
+                "content": [{"type": "text", "text": text}],
+                "usage": {"input_tokens": max(1, body_length // 4), "output_tokens": max(1, len(text) // 4)},
+            }
+            return {"body": _streaming(json.dumps(payload).encode("utf-8")), "contentType": "application/json"}
+        if key == "rekognition.DetectLabels":
+            return {"Labels": [{"Name": "Car", "Confidence": 99.1}, {"Name": "Dent", "Confidence": 91.4}]}
+        if key == "rekognition.DetectText":
+            return {"TextDetections": [{"DetectedText": "KJA 123 XY", "Type": "LINE", "Confidence": 97.0}]}
+        if key == "qbusiness.ChatSync":
+            return {"conversationId": str(uuid.uuid4()), "systemMessageId": str(uuid.uuid4()), "systemMessage": "The claim looks consistent."}
+        return {}
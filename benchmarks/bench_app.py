@@ -0,0 +1,37 @@
+# benchmarks/bench_app.py
+
+"""
+ASGI entry point for serving the app offline under a real process manager:
+`gunicorn benchmarks.bench_app:app -c gunicorn.conf.py`.
+
+Each worker builds its own offline app (AWS stand-ins, mongomock) on import and
+seeds the same benchmark user, so a token issued by one worker is accepted by
+every other.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import build_app  # noqa: E402
+from worker_scaling import BENCH_USER_EMAIL, BENCH_USER_ID, BENCH_USER_PASSWORD  # noqa: E402
+
+app = build_app(argparse.Namespace(
+    seed=int(os.environ.get("BENCH_SEED", "42")),
+    latency_scale=float(os.environ.get("BENCH_LATENCY_SCALE", "1.0")),
+    mongo_uri=None,
+))
+
+
+async def _seed_user() -> None:
+    from app.core.security import get_password_hash
+    from app.db.session import get_db_collection
+    from app.models.user import UserInDB
+
+    user = UserInDB(id=BENCH_USER_ID, email=BENCH_USER_EMAIL, full_name="Scaling Bench", hashed_password=get_password_hash(BENCH_USER_PASSWORD))
+    await get_db_collection("users").insert_one(user.dict())
+
+asyncio.run(_seed_user())
@@ -0,0 +1,207 @@
+# benchmarks/load_test.py
+
+"""
+End-to-end load and latency benchmark for the Veritas AI API.
+
+Runs the FastAPI app in-process under concurrent virtual users, with AWS
+replaced by latency-simulating stand-ins (see aws_standins.py) and Mongo
+replaced by mongomock (or a real mongod via --mongo-uri). Everything runs
+offline, and the same seed produces the same simulated latencies.
+
+Usage:
+    python benchmarks/load_test.py --users 20 --iterations 5
+    python benchmarks/load_test.py --output bench.json
+    python benchmarks/load_test.py --baseline bench.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Settings are read at import time, so placeholder values must be in place
+# before anything from `app` is imported.
+BENCH_ENV = {
+    "SECRET_KEY": "benchmark-secret",
+    "MONGO_CONNECTION_STRING": "mongodb://localhost:27017",
+    "MONGO_DB_NAME": "veritas_benchmark",
+    "AWS_ACCESS_KEY_ID": "benchmark",
+    "AWS_SECRET_ACCESS_KEY": "benchmark",
+    "AWS_REGION": "us-east-1",
+    "AWS_EC2_METADATA_DISABLED": "true",
+    "S3_UPLOADS_BUCKET_NAME": "veritas-benchmark-uploads",
+    "BEDROCK_MODEL_ID": "anthropic.claude-3-sonnet-20240229-v1:0",
+    "AMAZON_Q_APP_ID": "00000000-0000-0000-0000-000000000000",
+    "AMAZON_Q_USER_ID_PREFIX": "benchmark",
+    "REKOGNITION_SNS_TOPIC_ARN": "arn:aws:sns:us-east-1:000000000000:benchmark",
+    "REKOGNITION_ROLE_ARN": "arn:aws:iam::000000000000:role/benchmark",
+    "Q_DATASOURCE_BUCKET_NAME": "veritas-benchmark-context",
+    "Q_INDEX_ID": "benchmark-index",
+    "Q_DATASOURCE_ID": "benchmark-datasource",
+}
+
+ROUTES = ["signup", "token", "create_claim", "trigger_analysis", "get_claim", "start_conversation", "investigate_query"]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile; deterministic for a given sample set."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def timed(self, route: str, request, expected: int):
+        started = time.perf_counter()
+        response = await request
+        self.latencies[route].append(time.perf_counter() - started)
+        if response.status_code != expected:
+            self.errors[route] += 1
+        return response
+
+    def report(self, wall_time: float) -> dict:
+        routes = {}
+        for route in ROUTES:
+            samples = self.latencies.get(route, [])
+            if not samples:
+                continue
+            routes[route] = {
+                "requests": len(samples),
+                "errors": self.errors.get(route, 0),
+                "throughput_rps": round(len(samples) / wall_time, 2),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {"wall_time_s": round(wall_time, 2), "total_requests": total, "throughput_rps": round(total / wall_time, 2), "routes": routes}
+
+
+async def virtual_user(client, recorder: Recorder, user_index: int, iterations: int, files_per_claim: int):
+    email = f"bench-{user_index}-{uuid.uuid4().hex[:8]}@example.com"
+    password = "benchmark-password"
+
+    await recorder.timed("signup", client.post("/api/v1/auth/signup", json={"email": email, "password": password, "full_name": "Bench User"}), 201)
+    response = await recorder.timed("token", client.post("/api/v1/auth/token", data={"username": email, "password": password}), 200)
+    if response.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for _ in range(iterations):
+        response = await recorder.timed("create_claim", client.post("/api/v1/claims/", json={"file_count": files_per_claim, "additional_info": "Benchmark claim."}, headers=headers), 201)
+        if response.status_code != 201:
+            continue
+        claim_id = response.json()["claim_id"]
+
+        await recorder.timed("trigger_analysis", client.post(f"/api/v1/claims/{claim_id}/trigger-analysis", headers=headers), 202)
+        await recorder.timed("get_claim", client.get(f"/api/v1/claims/{claim_id}", headers=headers), 200)
+
+        response = await recorder.timed("start_conversation", client.post(f"/api/v1/investigate/{claim_id}/start-conversation", headers=headers), 200)
+        if response.status_code != 200:
+            continue
+        conversation = response.json()
+        query = {"query": "Is the incident date consistent with the photos?", "conversationId": conversation["conversationId"], "parentMessageId": conversation["systemMessageId"]}
+        await recorder.timed("investigate_query", client.post(f"/api/v1/investigate/{claim_id}/query", json=query, headers=headers), 200)
+
+
+def build_app(args):
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    if args.mongo_uri:
+        os.environ["MONGO_CONNECTION_STRING"] = args.mongo_uri
+
+    from aws_standins import SimulatedAWS
+    from app.core.resources import registry
+    from app.services.aws_service import aws_service
+    import main
+
+    SimulatedAWS(seed=args.seed, scale=args.latency_scale).install(aws_service)
+
+    if not args.mongo_uri:
+        from mongomock_motor import AsyncMongoMockClient
+        registry.mongo = AsyncMongoMockClient()
+
+    return main.app
+
+
+async def run(args) -> dict:
+    import httpx
+
+    app = build_app(args)
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(client, recorder, i, args.iterations, args.files_per_claim) for i in range(args.users)))
+        wall_time = time.perf_counter() - started
+    return recorder.report(wall_time)
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Returns a list of routes whose p95 regressed beyond the tolerance."""
+    regressions = []
+    for route, stats in report["routes"].items():
+        base = baseline.get("routes", {}).get(route)
+        if not base or not base.get("p95_ms"):
+            continue
+        if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {stats['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{'route':<20}{'reqs':>6}{'errs':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, s in report["routes"].items():
+        print(f"{route:<20}{s['requests']:>6}{s['errors']:>6}{s['throughput_rps']:>9}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
+    print(f"\n{report['total_requests']} requests in {report['wall_time_s']}s ({report['throughput_rps']} req/s)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline load and latency benchmark for the Veritas AI API.")
+    parser.add_argument("--users", type=int, default=10, help="Number of concurrent virtual users.")
+    parser.add_argument("--iterations", type=int, default=3, help="Claims created and analysed per user.")
+    parser.add_argument("--files-per-claim", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42, help="Seed for simulated AWS latencies.")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for all simulated AWS latencies.")
+    parser.add_argument("--mongo-uri", help="Use a real mongod instead of mongomock.")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    parser.add_argument("--baseline", help="Compare against a previous JSON report and fail on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 regression versus the baseline (0.2 = 20%%).")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\nPerformance regressions detected:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# benchmarks/payload_memory.py
+
+"""
+Memory profile of the Bedrock document payload path.
+
+For each file size, measures the peak Python heap allocated (tracemalloc) while
+`extract_text_from_file_with_bedrock` sends one document, and compares it with
+building the same request the old way (raw bytes, base64 copy, decoded str and
+json.dumps copy all in memory at once). A final run sends several large files
+concurrently to show the process-wide memory budget capping the peak.
+
+Usage:
+    python benchmarks/payload_memory.py
+    python benchmarks/payload_memory.py --sizes-mb 1 10 50 --concurrency 8 --budget-mb 64
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ROOT))
+sys.path.insert(0, ROOT)
+
+from load_test import BENCH_ENV  # noqa: E402
+
+
+def legacy_request(file_bytes: bytes) -> bytes:
+    """The request body as it used to be built, fully in memory."""
+    data = base64.b64encode(file_bytes).decode("utf-8")
+    return json.dumps({
+        "anthropic_version": "bedrock-2023-05-31", "max_tokens": 4096,
+        "messages": [{"role": "user", "content": [
+            {"type": "image", "source": {"type": "base64", "media_type": "application/pdf", "data": data}},
+            {"type": "text", "text": "Extract all text verbatim from the document."},
+        ]}],
+    }).encode("utf-8")
+
+
+def peak_of(func) -> int:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Peak memory of the Bedrock document payload path.")
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 5, 20, 50])
+    parser.add_argument("--concurrency", type=int, default=8, help="Documents sent at once in the budget run.")
+    parser.add_argument("--budget-mb", type=float, default=64, help="Payload memory budget for the budget run.")
+    args = parser.parse_args(argv)
+
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ["PAYLOAD_MEMORY_BUDGET_BYTES"] = str(int(args.budget_mb * 1024 * 1024))
+
+    from aws_standins import SimulatedAWS
+    from app.services.aws_service import aws_service as service
+
+    # The AWS clients are shared process-wide, so one set of stand-ins serves
+    # every run; only the simulated file changes.
+    standins = SimulatedAWS(scale=0)
+    standins.install(service)
+
+    mb = 1024 * 1024
+    print(f"{'file MB':>8}{'legacy peak MB':>16}{'streamed peak MB':>18}{'ratio':>8}")
+    for size_mb in args.sizes_mb:
+        file_bytes = os.urandom(int(size_mb * mb))
+        standins.fake_image = file_bytes
+        legacy = peak_of(lambda: legacy_request(file_bytes))
+        streamed = peak_of(lambda: service.extract_text_from_file_with_bedrock("claims/bench/file.pdf"))
+        print(f"{size_mb:>8}{legacy / mb:>16.1f}{streamed / mb:>18.1f}{legacy / max(streamed, 1):>7.1f}x")
+
+    size_mb = max(args.sizes_mb)
+    standins.fake_image = os.urandom(int(size_mb * mb))
+
+    def send_all():
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(lambda i: service.extract_text_from_file_with_bedrock(f"claims/bench/file_{i}.pdf"), range(args.concurrency)))
+
+    peak = peak_of(send_all)
+    print(f"\n{args.concurrency} x {size_mb} MB documents at once: peak {peak / mb:.1f} MB (budget {args.budget_mb} MB, legacy estimate {args.concurrency * 4.3 * size_mb:.0f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# benchmarks/progress_fanout.py
+
+"""
+Fan-out benchmark for the live claim progress stream (GET /claims/{id}/events).
+
+Starts the API on a local port, connects many SSE subscribers to one claim,
+then writes a series of document status changes and measures how long each
+takes to reach every subscriber. Against mongomock the hub polls; pointing
+--mongo-uri at a single-node replica set exercises the change-stream path:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 --port 27017
+    mongosh --eval 'rs.initiate()'
+    python benchmarks/progress_fanout.py --mongo-uri "mongodb://localhost:27017/?replicaSet=rs0"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import build_app, percentile
+
+
+async def subscriber(client, claim_id: str, headers: dict, sent_at: dict, latencies: List[float], expected: int, connected: list):
+    received = 0
+    async with client.stream("GET", f"/api/v1/claims/{claim_id}/events", headers=headers) as response:
+        connected.append(1)
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[len("data: "):])
+            if event.get("type") == "document" and event.get("filename") in sent_at:
+                latencies.append(time.perf_counter() - sent_at[event["filename"]])
+                received += 1
+                if received >= expected:
+                    return
+
+
+async def run(args) -> dict:
+    import httpx
+    import uvicorn
+
+    app = build_app(args)
+    from app.db import session
+    from app.services.progress_service import progress_hub
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    limits = httpx.Limits(max_connections=args.subscribers + 10)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60, limits=limits) as client:
+        await client.post("/api/v1/auth/signup", json={"email": "fanout@example.com", "password": "benchmark-password"})
+        token = (await client.post("/api/v1/auth/token", data={"username": "fanout@example.com", "password": "benchmark-password"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        claim_id = (await client.post("/api/v1/claims/", json={"file_count": args.updates}, headers=headers)).json()["claim_id"]
+
+        sent_at, latencies, connected = {}, [], []
+        tasks = [asyncio.create_task(subscriber(client, claim_id, headers, sent_at, latencies, args.updates, connected)) for _ in range(args.subscribers)]
+        while len(connected) < args.subscribers:
+            await asyncio.sleep(0.05)
+
+        documents = session.db.get_collection("documents")
+        for i in range(args.updates):
+            filename = f"file_{i}.jpg"
+            sent_at[filename] = time.perf_counter()
+            await documents.insert_one({"claim_id": claim_id, "original_filename": filename, "analysis_status": "completed"})
+            await asyncio.sleep(args.interval)
+
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=60)
+        mode = progress_hub.mode
+
+    server.should_exit = True
+    await server_task
+    return {
+        "mode": mode,
+        "subscribers": args.subscribers,
+        "deliveries": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fan-out latency benchmark for live claim progress.")
+    parser.add_argument("--subscribers", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=0.2, help="Seconds between document updates.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mongo-uri", help="Use a real mongod (a replica set enables change streams).")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    args.latency_scale = 0.0
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
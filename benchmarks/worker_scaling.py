@@ -0,0 +1,150 @@
+# benchmarks/worker_scaling.py
+
+"""
+Throughput scaling of the production serving mode with the number of workers.
+
+For each worker count, starts gunicorn with gunicorn.conf.py serving the offline
+app (benchmarks/bench_app.py), then drives it over real HTTP with a fixed number
+of concurrent clients for a fixed time. The workload mixes logins (bcrypt, CPU
+bound) and claim list reads, so the numbers reflect how well the server uses
+extra cores rather than how fast the simulated AWS calls are.
+
+Usage:
+    python benchmarks/worker_scaling.py
+    python benchmarks/worker_scaling.py --workers 1 2 4 8 --clients 64 --duration 15
+
+Worker counts above the CPUs available to the process are refused unless
+--allow-oversubscription is given.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from load_test import BENCH_ENV, percentile  # noqa: E402
+
+# Seeded into every worker by bench_app.py.
+BENCH_USER_ID = "00000000-0000-0000-0000-00000000beef"
+BENCH_USER_EMAIL = "scaling@example.com"
+BENCH_USER_PASSWORD = "benchmark-password"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = dict(BENCH_ENV, **os.environ, WEB_CONCURRENCY=str(workers), BENCH_LATENCY_SCALE="0")
+    command = [
+        sys.executable, "-m", "gunicorn", "benchmarks.bench_app:app",
+        "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "--access-logfile", "/dev/null",
+    ]
+    return subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_ready(client, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready in time.")
+
+
+async def drive(port: int, clients: int, duration: float, login_ratio: int) -> dict:
+    import httpx
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=httpx.Limits(max_connections=clients)) as client:
+        await wait_ready(client)
+        credentials = {"username": BENCH_USER_EMAIL, "password": BENCH_USER_PASSWORD}
+        token = (await client.post("/api/v1/auth/token", data=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        latencies: List[float] = []
+        errors = 0
+        deadline = time.perf_counter() + duration
+
+        async def worker(index: int):
+            nonlocal errors
+            n = index
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                if n % login_ratio == 0:
+                    response = await client.post("/api/v1/auth/token", data=credentials)
+                else:
+                    response = await client.get("/api/v1/claims/", headers=headers)
+                latencies.append(time.perf_counter() - started)
+                errors += response.status_code >= 400
+                n += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        wall_time = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall_time, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    default_workers = sorted({1, *(n for n in (2, 4, 8, 16) if n <= cpus), cpus})
+
+    parser = argparse.ArgumentParser(description="Throughput scaling with the number of gunicorn workers.")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent HTTP clients.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per worker count.")
+    parser.add_argument("--login-ratio", type=int, default=4, help="Every Nth request is a login.")
+    parser.add_argument("--allow-oversubscription", action="store_true", help="Also run worker counts above the usable CPUs.")
+    args = parser.parse_args(argv)
+
+    # Workers beyond the CPUs this process may run on only share the same cores, so
+    # their speedup says nothing about scaling (common in containers with a CPU limit).
+    oversubscribed = [workers for workers in args.workers if workers > cpus]
+    if oversubscribed and not args.allow_oversubscription:
+        print(f"ERROR: {max(oversubscribed)} workers requested but only {cpus} usable CPUs. "
+              f"Lower --workers or pass --allow-oversubscription.", file=sys.stderr)
+        return 2
+    print(f"{cpus} usable CPUs\n")
+    if oversubscribed:
+        print(f"WARNING: {', '.join(map(str, oversubscribed))} workers exceed the usable CPUs; those rows are oversubscribed.\n")
+    print(f"{'workers':>8}{'reqs':>8}{'errs':>6}{'rps':>9}{'speedup':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    baseline = None
+    for workers in args.workers:
+        port = free_port()
+        server = start_server(workers, port)
+        try:
+            result = asyncio.run(drive(port, args.clients, args.duration, args.login_ratio))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+        baseline = baseline or result["throughput_rps"]
+        speedup = result["throughput_rps"] / baseline if baseline else 0.0
+        print(f"{workers:>8}{result['requests']:>8}{result['errors']:>6}{result['throughput_rps']:>9}{speedup:>8.2f}x{result['p50_ms']:>9}{result['p95_ms']:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
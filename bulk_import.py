@@ -0,0 +1,138 @@
+# bulk_import.py
+
+"""
+Imports a legacy book of claims through the bulk claim API.
+
+Claims are read from a JSONL or CSV file (fields: file_count, additional_info,
+optional incident_date, optional idempotency_key and optional files, a
+';'-separated list of local paths to upload). Each claim gets a stable idempotency key - taken from the row, or
+derived from its contents - and every key the API confirms is recorded in a
+state file, so an interrupted import can simply be run again.
+
+Usage:
+    python bulk_import.py --api-url http://localhost:8000/api/v1 --email me@example.com --password ... --input claims.jsonl
+    python bulk_import.py --token <jwt> --input claims.csv --state-file claims.state --upload
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Set
+
+import httpx
+
+
+def read_rows(path: str) -> Iterator[Dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def to_item(row: Dict) -> Dict:
+    files = row.get("files") or []
+    if isinstance(files, str):
+        files = [p for p in files.split(";") if p]
+    item = {
+        "file_count": int(row.get("file_count") or len(files)),
+        "additional_info": row.get("additional_info") or None,
+    }
+    if row.get("incident_date"):
+        # Only set when present, so keys derived for rows without it stay the same.
+        item["incident_date"] = row["incident_date"]
+    # Without an explicit key, the same row always hashes to the same key.
+    item["idempotency_key"] = row.get("idempotency_key") or hashlib.sha256(json.dumps(dict(item, files=files), sort_keys=True).encode("utf-8")).hexdigest()
+    return {"item": item, "files": files}
+
+
+def load_state(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def login(client: httpx.Client, email: str, password: str) -> str:
+    response = client.post("/auth/token", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def upload_files(client: httpx.Client, upload_urls: List[Dict], files: List[str]) -> None:
+    for target, path in zip(upload_urls, files):
+        with open(path, "rb") as f:
+            response = client.post(target["url"], data=target["fields"], files={"file": (os.path.basename(path), f)})
+        response.raise_for_status()
+
+
+def import_batch(client: httpx.Client, rows: List[Dict], state, upload: bool, totals: Dict[str, int]) -> None:
+    files_by_key = {row["item"]["idempotency_key"]: row["files"] for row in rows}
+    with client.stream("POST", "/claims/bulk", json={"items": [row["item"] for row in rows]}) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            result = json.loads(line)
+            if "summary" in result:
+                continue
+            key, status = result["idempotency_key"], result["status"]
+            if status == "failed":
+                print(f"FAILED {key}: {result.get('error')}", file=sys.stderr)
+            else:
+                try:
+                    if upload and files_by_key.get(key):
+                        upload_files(client, result["upload_urls"], files_by_key[key])
+                except (OSError, httpx.HTTPError) as e:
+                    print(f"UPLOAD FAILED {key} ({result['claim_id']}): {e}", file=sys.stderr)
+                    status = "failed"
+                else:
+                    state.write(key + "\n")
+                    state.flush()
+            totals[status] = totals.get(status, 0) + 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-import claims into Veritas AI.")
+    parser.add_argument("--api-url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--token", help="Use an existing access token instead of logging in.")
+    parser.add_argument("--input", required=True, help="JSONL or CSV file of claims.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Claims sent per bulk request.")
+    parser.add_argument("--state-file", help="Keys already imported (default: <input>.state).")
+    parser.add_argument("--upload", action="store_true", help="Upload each claim's listed files to its presigned targets.")
+    args = parser.parse_args(argv)
+
+    state_path = args.state_file or f"{args.input}.state"
+    done = load_state(state_path)
+    totals: Dict[str, int] = {"skipped": 0}
+
+    with httpx.Client(base_url=args.api_url, timeout=httpx.Timeout(30.0, read=None)) as client:
+        token = args.token or login(client, args.email, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        with open(state_path, "a", encoding="utf-8") as state:
+            batch: List[Dict] = []
+            for row in map(to_item, read_rows(args.input)):
+                if row["item"]["idempotency_key"] in done:
+                    totals["skipped"] += 1
+                    continue
+                batch.append(row)
+                if len(batch) >= args.batch_size:
+                    import_batch(client, batch, state, args.upload, totals)
+                    batch = []
+            if batch:
+                import_batch(client, batch, state, args.upload, totals)
+
+    print(", ".join(f"{name}: {count}" for name, count in sorted(totals.items())))
+    return 1 if totals.get("failed") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
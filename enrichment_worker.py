@@ -0,0 +1,70 @@
+# enrichment_worker.py
+
+"""
+Background worker for the enrichment queue (reverse image search and the
+re-synthesis it triggers). Any number of workers can run side by side: jobs are
+leased atomically and the Custom Search budgets are shared through MongoDB.
+
+Usage:
+    python enrichment_worker.py
+    python enrichment_worker.py --concurrency 2
+    python enrichment_worker.py --once   (drain what is due now, then exit)
+"""
+
+import argparse
+import asyncio
+import sys
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.resources import registry
+from app.services.analytics_service import analytics_rollups
+from app.services.enrichment_service import ensure_indexes, process_next_job
+
+
+def collections() -> dict:
+    db = registry.mongo[settings.MONGO_DB_NAME]
+    return {
+        "jobs": db.enrichment_jobs, "cache": db.reverse_search_cache, "quota": db.enrichment_quota,
+        "documents": db.documents, "claims": db.claims, "entity_index": db.entity_index,
+    }
+
+
+async def work(targets: dict, once: bool) -> int:
+    processed = 0
+    while True:
+        job = await process_next_job(targets)
+        if job is not None:
+            processed += 1
+            continue
+        if once:
+            return processed
+        await asyncio.sleep(settings.ENRICHMENT_POLL_INTERVAL_SECONDS)
+
+
+async def run(concurrency: int, once: bool) -> int:
+    await registry.startup()
+    try:
+        targets = collections()
+        await ensure_indexes(targets["jobs"], targets["cache"], targets["quota"])
+        counts = await asyncio.gather(*(work(targets, once) for _ in range(concurrency)))
+        print(f"Processed {sum(counts)} enrichment jobs.")
+        return 0
+    finally:
+        await analytics_rollups.stop()
+        registry.shutdown()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the claim enrichment queue.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Jobs processed at once by this worker.")
+    parser.add_argument("--once", action="store_true", help="Exit once no job is due instead of polling.")
+    args = parser.parse_args(argv)
+    try:
+        return asyncio.run(run(args.concurrency, args.once))
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
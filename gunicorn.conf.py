@@ -0,0 +1,66 @@
+# gunicorn.conf.py
+
+"""
+Production serving configuration: `gunicorn main:app -c gunicorn.conf.py`.
+
+Gunicorn supervises one uvicorn worker process per usable CPU. The app is not
+preloaded, so every worker builds its own Mongo and AWS clients after the fork
+(neither is fork-safe) and closes them again in the app lifespan.
+"""
+
+import os
+import shutil
+import tempfile
+
+
+def usable_cpus() -> int:
+    # Respects CPU affinity (taskset, cpusets), which os.cpu_count() ignores.
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '80')}"
+worker_class = "app.core.workers.VeritasUvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", usable_cpus()))
+preload_app = False
+
+# Claim analysis runs inside the request, so requests can legitimately be slow.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "300"))
+# On SIGTERM, workers stop accepting connections and get this long to finish
+# in-flight requests (and SSE streams) before they are killed.
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Recycle workers periodically to bound slow leaks; the jitter keeps them from
+# all restarting at the same moment.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# Worker heartbeats go to tmpfs so a slow disk cannot get workers killed.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = "-"
+errorlog = "-"
+
+# Prometheus metrics: each worker writes its values to files in this directory
+# and /metrics merges them (see app/core/metrics.py). It must be set before the
+# workers import prometheus_client, which this config file guarantees.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "veritas-prometheus"),
+)
+
+
+def on_starting(server):
+    # Values left over from a previous run would otherwise be added to this one's.
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -2,28 +2,26 @@
 
 import os
 import urllib.parse
-from pymongo import MongoClient
 from datetime import datetime
 import asyncio
 
 # NOTE: For deployment, you would create a Lambda Layer or package the 'app' directory
 # into your deployment zip. This code assumes the service files are available.
-from app.services.aws_service import AWSService
+from app.core.resources import registry
+from app.services.aws_service import aws_service
+from app.services.blob_service import offload_fields
+from app.services.entity_service import build_index_operations, extract_entities
+from app.services.enrichment_service import NOT_CONFIGURED_REVERSE_SEARCH, PENDING_REVERSE_SEARCH, REVERSE_SEARCH, enqueue_operation, reverse_search_configured
 
 # --- Initialize outside the handler for performance (re-used across invocations) ---
-MONGO_URI = os.environ.get("MONGO_CONNECTION_STRING")
-MONGO_DB = os.environ.get("MONGO_DB_NAME")
-
-try:
-    client = MongoClient(MONGO_URI)
-    db = client[MONGO_DB]
-    claims_collection = db.claims
-    documents_collection = db.documents
-except Exception as e:
-    print(f"FATAL: Could not connect to MongoDB: {e}")
-    # This will cause the Lambda to fail on initialization, which is what we want.
-
-aws_service = AWSService()
+# The registry's sync client and shared AWS clients keep their pools open between
+# invocations of a warm container.
+db = registry.sync_database()
+claims_collection = db.claims
+documents_collection = db.documents
+entity_index_collection = db.entity_index
+reverse_search_cache_collection = db.reverse_search_cache
+enrichment_jobs_collection = db.enrichment_jobs
 
 def handler(event, context):
     """
@@ -33,6 +31,10 @@ def handler(event, context):
     # 1. Get file info from the S3 trigger event
     s3_record = event['Records'][0]['s3']
     s3_key = urllib.parse.unquote_plus(s3_record['object']['key'], encoding='utf-8')
+    if not s3_key.startswith("claims/"):
+        # Retrieval indexes and offloaded blobs share the bucket; only claim uploads are processed.
+        print(f"Skipping non-upload object: {s3_key}")
+        return {'statusCode': 200, 'body': 'Not a claim upload'}
     
     try:
         # Assumes S3 key format: "claims/{claim_id}/{unique_filename}"
@@ -72,23 +74,38 @@ def handler(event, context):
         print(f"Performing advanced forensic analysis on {s3_key}...")
         forensics = aws_service.analyze_image_forensics(s3_key)
         
-        print(f"Performing reverse image search on {s3_key}...")
-        reverse_search = aws_service.reverse_image_search(s3_key)
+        # Reverse search runs on the enrichment queue (enrichment_worker.py) within the
+        # CSE quota; only a cached result for the same image is used here.
+        image_hash = aws_service.get_object_etag(s3_key)
+        cached = reverse_search_cache_collection.find_one({"_id": image_hash}) if image_hash else None
+        if cached:
+            reverse_search = cached["result"]
+        elif not reverse_search_configured():
+            reverse_search = dict(NOT_CONFIGURED_REVERSE_SEARCH)
+        else:
+            reverse_search = dict(PENDING_REVERSE_SEARCH)
+            enrichment_jobs_collection.update_one(*enqueue_operation(REVERSE_SEARCH, claim_id, s3_key, image_hash), upsert=True)
         
         print(f"Extracting EXIF metadata from {s3_key}...")
         metadata = aws_service.extract_image_metadata(s3_key)
         
         image_text = aws_service.extract_text_with_textract(s3_key)
 
+        # Keep the cross-claim entity index current as each image completes.
+        entity_keys = extract_entities(forensics, metadata, reverse_search)
+        if entity_keys:
+            entity_index_collection.bulk_write(build_index_operations(claim_id, entity_keys), ordered=False)
+
         documents_collection.update_one(
             {"_id": doc_id},
-            {"$set": {
+            {"$set": offload_fields(claim_id, {
                 "extracted_text": image_text,
                 "image_analysis_results": forensics,
                 "reverse_image_search_results": reverse_search,
                 "image_metadata": metadata,
+                "entity_keys": entity_keys,
                 "analysis_status": "completed"
-            }}
+            })}
         )
     elif is_video:
         # Start the asynchronous video analysis job
@@ -107,7 +124,7 @@ def handler(event, context):
         text = aws_service.extract_text_with_textract(s3_key)
         documents_collection.update_one(
             {"_id": doc_id},
-            {"$set": {"extracted_text": text, "analysis_status": "completed"}}
+            {"$set": offload_fields(claim_id, {"extracted_text": text, "analysis_status": "completed"})}
         )
 
     print(f"SUCCESS: Finished individual processing or job start for file {s3_key}.")
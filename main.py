@@ -1,13 +1,34 @@
 # main.py
 
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from app.core.config import settings
+from app.core.metrics import OPERATIONS_IN_FLIGHT, record, render_latest
 from app.api.v1.api import api_router
+from app.services.progress_service import progress_hub
+from app.services.analytics_service import analytics_rollups
+from app.core.resources import registry
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Each worker process owns one set of pools (see app/core/resources.py),
+    # created after the fork and closed again on shutdown.
+    await registry.startup()
+    yield
+    # Stop the shared change-stream watcher so shutdown is not held up by it.
+    await progress_hub.stop()
+    # Write out analytics rollups still waiting for their debounce.
+    await analytics_rollups.stop()
+    registry.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -18,8 +39,61 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Claim payloads (summaries, risk factors, usage records) compress well; small
+# responses are left alone since gzip would only add CPU for no gain.
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+
+def _route_template(request: Request) -> str:
+    # Label by the route template (e.g. /api/v1/claims/{claim_id}) rather than the raw
+    # path, otherwise every claim id would create a new time series. The router records
+    # the matched route in the scope once the request is routed, but for a route of an
+    # included router its template lacks the router's prefix ("/{claim_id}"). The prefix
+    # is the part of the path before the segments the template matched.
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+    template = getattr(route, "path_format", route.path)
+    prefix = request.url.path.rsplit("/", template.count("/"))[0]
+    return prefix + template
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # The route is only known after `call_next`, so the in-flight gauge, which has to
+    # be raised before, is labelled by method alone. Latency and errors are recorded
+    # afterwards under "<method> <route template>".
+    in_flight = OPERATIONS_IN_FLIGHT.labels("http", request.method)
+    in_flight.inc()
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception as e:
+        record("http", f"{request.method} {_route_template(request)}", time.perf_counter() - started, type(e).__name__)
+        raise
+    finally:
+        in_flight.dec()
+    error = f"HTTP{response.status_code}" if response.status_code >= 500 else None
+    record("http", f"{request.method} {_route_template(request)}", time.perf_counter() - started, error)
+    return response
+
 @app.get("/", tags=["Root"])
 async def read_root():
-    return {"message": f"Welcome to {settings.PROJECT_NAME}"}
\ No newline at end of file
+    return {"message": f"Welcome to {settings.PROJECT_NAME}"}
+
+@app.get("/health/live", include_in_schema=False)
+async def liveness():
+    return {"status": "ok"}
+
+@app.get("/health/ready", include_in_schema=False)
+async def readiness():
+    # Pool stats are included so a failing probe shows whether the pools were exhausted.
+    result = await registry.readiness()
+    result["pools"] = registry.stats()
+    return JSONResponse(result, status_code=200 if result["ready"] else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    payload, content_type = render_latest()
+    return Response(content=payload, media_type=content_type)
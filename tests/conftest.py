@@ -0,0 +1,30 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# Settings are read on import and several have no default; the tests never reach
+# AWS or a real MongoDB, so placeholder values are enough.
+TEST_ENV = {
+    "SECRET_KEY": "test-secret",
+    "MONGO_CONNECTION_STRING": "mongodb://localhost:27017",
+    "MONGO_DB_NAME": "veritas_test",
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_REGION": "us-east-1",
+    "AWS_EC2_METADATA_DISABLED": "true",
+    "S3_UPLOADS_BUCKET_NAME": "veritas-test-uploads",
+    "BEDROCK_MODEL_ID": "anthropic.claude-3-sonnet-20240229-v1:0",
+    "AMAZON_Q_APP_ID": "00000000-0000-0000-0000-000000000000",
+    "AMAZON_Q_USER_ID_PREFIX": "test",
+    "REKOGNITION_SNS_TOPIC_ARN": "arn:aws:sns:us-east-1:000000000000:test",
+    "REKOGNITION_ROLE_ARN": "arn:aws:iam::000000000000:role/test",
+    "Q_DATASOURCE_BUCKET_NAME": "veritas-test-context",
+    "Q_INDEX_ID": "test-index",
+    "Q_DATASOURCE_ID": "test-datasource",
+}
+
+for key, value in TEST_ENV.items():
+    os.environ.setdefault(key, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,109 @@
+# tests/test_analysis_runs.py
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.services import claim_analysis_service
+from app.services.claim_analysis_service import AnalysisRuns
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Replaces the analysis pipeline with a slow stand-in that counts its runs."""
+    calls = []
+
+    async def run_analysis_pipeline(claim, full_synthesis):
+        calls.append(claim["id"])
+        await asyncio.sleep(0.05)
+        return {"status": "analysis_complete", "risk_score": 42, "updated_at": datetime.utcnow()}, ["phone:+15550100"]
+
+    monkeypatch.setattr(claim_analysis_service, "run_analysis_pipeline", run_analysis_pipeline)
+    monkeypatch.setattr(claim_analysis_service.analytics_rollups, "mark_dirty", lambda adjuster_id: None)
+    return calls
+
+
+async def _claims(**fields):
+    claims = AsyncMongoMockClient()["veritas_test"]["claims"]
+    await claims.insert_one({"id": "claim-1", "adjuster_id": "adjuster-1", "status": "uploaded", **fields})
+    return claims
+
+
+def test_concurrent_triggers_run_the_pipeline_once(pipeline):
+    async def scenario():
+        claims = await _claims()
+        runs = AnalysisRuns(lease_seconds=60, poll_interval=0.01)
+        return await asyncio.gather(*(runs.trigger(claims, "claim-1", "adjuster-1") for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert pipeline == ["claim-1"]
+    assert all(claim["status"] == "analysis_complete" for claim in results)
+    assert all("analysis_lease" not in claim for claim in results)
+
+
+def test_concurrent_triggers_in_other_processes_attach_to_the_run(pipeline):
+    async def scenario():
+        claims = await _claims()
+        # One AnalysisRuns per worker process: the second only sees the lease in MongoDB.
+        first, second = AnalysisRuns(lease_seconds=60, poll_interval=0.01), AnalysisRuns(lease_seconds=60, poll_interval=0.01)
+        return await asyncio.gather(first.trigger(claims, "claim-1", "adjuster-1"), second.trigger(claims, "claim-1", "adjuster-1"))
+
+    results = asyncio.run(scenario())
+    assert pipeline == ["claim-1"]
+    assert [claim["status"] for claim in results] == ["analysis_complete", "analysis_complete"]
+
+
+def test_retry_with_the_same_idempotency_key_returns_the_stored_result(pipeline):
+    async def scenario():
+        claims = await _claims()
+        runs = AnalysisRuns(lease_seconds=60, poll_interval=0.01)
+        first = await runs.trigger(claims, "claim-1", "adjuster-1", idempotency_key="key-1")
+        retried = await runs.trigger(claims, "claim-1", "adjuster-1", idempotency_key="key-1")
+        assert pipeline == ["claim-1"]
+        assert retried["updated_at"] == first["updated_at"]
+        await runs.trigger(claims, "claim-1", "adjuster-1", idempotency_key="key-2")
+        assert pipeline == ["claim-1", "claim-1"]
+
+    asyncio.run(scenario())
+
+
+def test_an_expired_lease_is_taken_over(pipeline):
+    async def scenario():
+        expired = {"run_id": "crashed-run", "started_at": datetime.utcnow() - timedelta(hours=1), "expires_at": datetime.utcnow() - timedelta(seconds=1)}
+        claims = await _claims(status="analyzing", analysis_lease=expired)
+        return await AnalysisRuns(lease_seconds=60, poll_interval=0.01).trigger(claims, "claim-1", "adjuster-1")
+
+    claim = asyncio.run(scenario())
+    assert pipeline == ["claim-1"]
+    assert claim["status"] == "analysis_complete"
+    assert "analysis_lease" not in claim
+
+
+def test_a_lease_that_stops_being_renewed_is_taken_over_by_a_waiting_trigger(pipeline):
+    async def scenario():
+        # Owned by a worker that died mid-run: the lease is live now but never renewed.
+        stalled = {"run_id": "stalled-run", "started_at": datetime.utcnow(), "expires_at": datetime.utcnow() + timedelta(seconds=0.1)}
+        claims = await _claims(status="analyzing", analysis_lease=stalled)
+        return await AnalysisRuns(lease_seconds=60, poll_interval=0.01).trigger(claims, "claim-1", "adjuster-1")
+
+    claim = asyncio.run(scenario())
+    assert pipeline == ["claim-1"]
+    assert claim["status"] == "analysis_complete"
+
+
+def test_a_run_that_lost_its_lease_does_not_overwrite_the_claim(pipeline):
+    async def scenario():
+        claims = await _claims()
+        runs = AnalysisRuns(lease_seconds=60, poll_interval=0.01)
+        trigger = asyncio.create_task(runs.trigger(claims, "claim-1", "adjuster-1"))
+        await asyncio.sleep(0.01)
+        # A newer run took the claim over while this one was still analysing.
+        await claims.update_one({"id": "claim-1"}, {"$set": {"analysis_lease.run_id": "newer-run"}})
+        await trigger
+        return await claims.find_one({"id": "claim-1"})
+
+    claim = asyncio.run(scenario())
+    assert claim["status"] == "analyzing"
+    assert claim["analysis_lease"]["run_id"] == "newer-run"
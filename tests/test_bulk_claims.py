@@ -0,0 +1,78 @@
+# tests/test_bulk_claims.py
+
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import BulkWriteError
+
+from app.crud import crud_claim
+from app.models.claim import BulkClaimItem
+
+
+@pytest.fixture
+def claims(monkeypatch):
+    monkeypatch.setattr(crud_claim, "_idempotency_index_ready", False)
+    return AsyncMongoMockClient()["veritas_test"]["claims"]
+
+
+def _import(claims, items):
+    async def collect():
+        return [result async for result in crud_claim.bulk_create_claims(claims, "adjuster-1", items)]
+    return asyncio.run(collect())
+
+
+def _items(*keys):
+    return [BulkClaimItem(idempotency_key=key, file_count=1) for key in keys]
+
+
+def test_a_repeated_key_resolves_to_the_claim_created_for_it(claims, monkeypatch):
+    monkeypatch.setattr(crud_claim, "presign_upload_targets", lambda s3_keys: [{"url": key} for key in s3_keys])
+    first, repeated, summary = _import(claims, _items("a", "a"))
+
+    assert first["status"] == "created"
+    assert repeated["status"] == "existing"
+    assert repeated["claim_id"] == first["claim_id"]
+    assert repeated["upload_urls"] == first["upload_urls"]
+    assert summary["summary"] == {"created": 1, "existing": 1, "failed": 0, "total": 2}
+    assert asyncio.run(claims.count_documents({})) == 1
+
+
+def _failing_insert(error):
+    async def insert_many(documents, ordered=True):
+        raise BulkWriteError({"writeErrors": [dict(error, index=0)]})
+    return insert_many
+
+
+def test_a_repeated_key_fails_when_its_first_occurrence_failed(claims, monkeypatch):
+    monkeypatch.setattr(crud_claim, "presign_upload_targets", lambda s3_keys: [{"url": key} for key in s3_keys])
+    monkeypatch.setattr(claims, "insert_many", _failing_insert({"code": 121, "errmsg": "Document failed validation"}))
+    first, repeated, summary = _import(claims, _items("a", "a"))
+
+    assert first["status"] == "failed"
+    assert repeated["status"] == "failed"
+    assert repeated["error"] == first["error"] == "Document failed validation"
+    assert summary["summary"] == {"created": 0, "existing": 0, "failed": 2, "total": 2}
+
+
+def test_a_repeated_key_follows_a_claim_created_concurrently_for_it(claims, monkeypatch):
+    monkeypatch.setattr(crud_claim, "presign_upload_targets", lambda s3_keys: [{"url": key} for key in s3_keys])
+    # Another import wrote the key between this batch's lookup and its insert.
+    asyncio.run(claims.insert_one({"id": "concurrent-claim", "adjuster_id": "adjuster-1", "idempotency_key": "a", "s3_keys": ["claims/concurrent-claim/file_1"]}))
+    nothing_yet = AsyncMongoMockClient()["veritas_test"]["nothing_yet"]
+    monkeypatch.setattr(claims, "find", lambda *args, **kwargs: nothing_yet.find())
+    monkeypatch.setattr(claims, "insert_many", _failing_insert({"code": crud_claim.DUPLICATE_KEY_ERROR, "errmsg": "duplicate key"}))
+    first, repeated, summary = _import(claims, _items("a", "a"))
+
+    assert first["status"] == repeated["status"] == "existing"
+    assert first["claim_id"] == repeated["claim_id"] == "concurrent-claim"
+    assert repeated["upload_urls"] == [{"url": "claims/concurrent-claim/file_1"}]
+
+
+def test_resending_the_items_reports_them_as_existing(claims, monkeypatch):
+    monkeypatch.setattr(crud_claim, "presign_upload_targets", lambda s3_keys: [{"url": key} for key in s3_keys])
+    created = _import(claims, _items("a", "b"))
+    resent = _import(claims, _items("a", "b"))
+
+    assert [result["status"] for result in resent[:-1]] == ["existing", "existing"]
+    assert [result["claim_id"] for result in resent[:-1]] == [result["claim_id"] for result in created[:-1]]
@@ -0,0 +1,52 @@
+# tests/test_http_cache.py
+
+from datetime import datetime, timedelta, timezone
+
+from starlette.requests import Request
+
+from app.core.http_cache import http_date, is_not_modified, make_etag
+
+LAST_MODIFIED = datetime(2024, 5, 1, 12, 30, 15, 250000)
+
+
+def _request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_make_etag_is_weak_and_changes_with_the_version():
+    etag = make_etag("claim-1", LAST_MODIFIED)
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == make_etag("claim-1", LAST_MODIFIED)
+    assert etag != make_etag("claim-1", LAST_MODIFIED + timedelta(seconds=1))
+    assert etag != make_etag("claim-2", LAST_MODIFIED)
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = make_etag("claim-1", LAST_MODIFIED)
+    assert is_not_modified(_request(if_none_match=etag), etag, LAST_MODIFIED)
+    assert is_not_modified(_request(if_none_match=etag.removeprefix("W/")), etag, LAST_MODIFIED)
+    assert is_not_modified(_request(if_none_match=f'"other", {etag}'), etag, LAST_MODIFIED)
+    assert is_not_modified(_request(if_none_match="*"), etag, LAST_MODIFIED)
+    assert not is_not_modified(_request(if_none_match='W/"other"'), etag, LAST_MODIFIED)
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    etag = make_etag("claim-1", LAST_MODIFIED)
+    request = _request(if_none_match='W/"other"', if_modified_since=http_date(LAST_MODIFIED))
+    assert not is_not_modified(request, etag, LAST_MODIFIED)
+
+
+def test_if_modified_since_compares_at_one_second_resolution():
+    etag = make_etag("claim-1", LAST_MODIFIED)
+    # The HTTP date drops the microseconds of the naive UTC timestamp.
+    assert is_not_modified(_request(if_modified_since=http_date(LAST_MODIFIED)), etag, LAST_MODIFIED)
+    assert not is_not_modified(_request(if_modified_since=http_date(LAST_MODIFIED - timedelta(seconds=1))), etag, LAST_MODIFIED)
+    assert is_not_modified(_request(if_modified_since=http_date(LAST_MODIFIED.replace(tzinfo=timezone.utc))), etag, LAST_MODIFIED)
+
+
+def test_unusable_conditions_mean_modified():
+    etag = make_etag("claim-1", LAST_MODIFIED)
+    assert not is_not_modified(_request(), etag, LAST_MODIFIED)
+    assert not is_not_modified(_request(if_modified_since="not a date"), etag, LAST_MODIFIED)
+    assert not is_not_modified(_request(if_modified_since=http_date(LAST_MODIFIED)), etag, None)
@@ -0,0 +1,59 @@
+# tests/test_payload_service.py
+
+import base64
+import io
+import json
+
+import pytest
+
+from app.services import payload_service
+from app.services.payload_service import DATA_PLACEHOLDER, build_document_payload, encoded_length, write_base64
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 4, 5, 1000, 1001, 1002])
+@pytest.mark.parametrize("chunk_bytes", [1, 2, 3, 4, 7, 64, 4096])
+def test_write_base64_matches_one_shot_encoding(size, chunk_bytes):
+    data = bytes(range(256)) * 4
+    data = data[:size]
+    target = io.BytesIO()
+
+    written = write_base64(io.BytesIO(data), target, chunk_bytes)
+
+    assert target.getvalue() == base64.b64encode(data)
+    assert written == encoded_length(size) == len(target.getvalue())
+
+
+class ShortReads(io.BytesIO):
+    """A stream that returns fewer bytes than asked for, like a socket."""
+
+    def read(self, size=-1):
+        return super().read(min(size, 5) if size and size > 0 else size)
+
+
+def test_write_base64_carries_partial_groups_across_short_reads():
+    data = b"claim document bytes" * 7
+    target = io.BytesIO()
+    write_base64(ShortReads(data), target, 9)
+    assert base64.b64decode(target.getvalue()) == data
+
+
+def test_build_document_payload_embeds_the_file_in_the_request(monkeypatch):
+    monkeypatch.setattr(payload_service.settings, "PAYLOAD_CHUNK_BYTES", 10)
+    monkeypatch.setattr(payload_service.settings, "PAYLOAD_SPOOL_MAX_BYTES", 64)
+    data = b"%PDF-1.7 " + bytes(range(200))
+    request = {
+        "max_tokens": 4096,
+        "messages": [{"role": "user", "content": [
+            {"type": "image", "source": {"type": "base64", "media_type": "application/pdf", "data": DATA_PLACEHOLDER}},
+            {"type": "text", "text": "Extract all text."},
+        ]}],
+    }
+
+    body, length = build_document_payload(io.BytesIO(data), request)
+    with body:
+        raw = body.read()
+
+    assert length == len(raw)
+    parsed = json.loads(raw)
+    assert base64.b64decode(parsed["messages"][0]["content"][0]["source"]["data"]) == data
+    assert parsed["messages"][0]["content"][1] == request["messages"][0]["content"][1]
@@ -0,0 +1,39 @@
+# tests/test_request_metrics.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    operations = []
+    monkeypatch.setattr(main, "record", lambda component, operation, seconds, error=None: operations.append((component, operation, error)))
+    # Not entered as a context manager, so the lifespan (database pools) never runs.
+    return operations, TestClient(main.app, raise_server_exceptions=False)
+
+
+@pytest.mark.parametrize("path, template", [
+    ("/", "GET /"),
+    ("/health/live", "GET /health/live"),
+    # Routes of included routers carry the router prefixes in front of their own template.
+    ("/api/v1/claims/3f2a9c", "GET /api/v1/claims/{claim_id}"),
+    ("/api/v1/claims/3f2a9c/events", "GET /api/v1/claims/{claim_id}/events"),
+    # A wrong method (405) is still labelled by the route it partially matched.
+    ("/api/v1/investigate/3f2a9c/query", "GET /api/v1/investigate/{claim_id}/query"),
+    # A claim id that happens to repeat a prefix segment must not be mistaken for it.
+    ("/api/v1/claims/claims", "GET /api/v1/claims/{claim_id}"),
+    ("/api/v1/no/such/route", "GET unmatched"),
+])
+def test_requests_are_labelled_by_route_template(recorded, path, template):
+    operations, client = recorded
+    client.get(path)
+    assert operations == [("http", template, None)]
+
+
+def test_different_claims_share_one_label(recorded):
+    operations, client = recorded
+    for claim_id in ("a1", "b2", "c3"):
+        client.get(f"/api/v1/claims/{claim_id}")
+    assert {operation for _, operation, _ in operations} == {"GET /api/v1/claims/{claim_id}"}
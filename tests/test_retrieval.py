@@ -0,0 +1,67 @@
+# tests/test_retrieval.py
+
+import json
+
+from app.services import retrieval_service
+from app.services.retrieval_service import build_index, chunk_text, format_query_with_passages, search, tokenize
+
+SOURCES = [
+    ("police_report.pdf", "The vehicle was parked on Elm Street when the collision happened at night."),
+    ("repair_invoice.pdf", "Invoice for bumper replacement and paint. Bumper bumper bumper labour total 1200."),
+    ("statement.txt", "The driver states the windshield cracked after hail on the highway."),
+]
+
+
+def test_tokenize_lowercases_and_drops_stopwords():
+    assert tokenize("The Windshield was CRACKED, and the hood-dented!") == ["windshield", "cracked", "hood", "dented"]
+
+
+def test_chunk_text_overlaps_windows_and_covers_every_word():
+    words = [f"w{i}" for i in range(10)]
+    chunks = chunk_text(" ".join(words), chunk_words=4, overlap=1)
+    assert chunks == ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"]
+    assert chunk_text("   ", chunk_words=4, overlap=1) == []
+
+
+def test_search_ranks_the_chunk_about_the_query_first():
+    index = build_index(SOURCES)
+    results = search(index, "hail damage to the windshield", top_k=3)
+    assert results[0]["source"] == "statement.txt"
+    assert [r["source"] for r in results] == ["statement.txt"]
+
+
+def test_search_scores_by_term_frequency_and_rarity():
+    index = build_index(SOURCES)
+    results = search(index, "bumper collision", top_k=3)
+    # "bumper" appears four times in the invoice, "collision" once in the report.
+    assert [r["source"] for r in results] == ["repair_invoice.pdf", "police_report.pdf"]
+    assert results[0]["score"] > results[1]["score"] > 0
+
+
+def test_search_normalises_for_chunk_length():
+    padding = " ".join(f"filler{i}" for i in range(40))
+    index = build_index([("short.txt", "stolen laptop"), ("long.txt", f"stolen laptop {padding}")])
+    assert [r["source"] for r in search(index, "stolen laptop", top_k=2)] == ["short.txt", "long.txt"]
+
+
+def test_search_respects_top_k_and_unknown_terms():
+    index = build_index(SOURCES)
+    assert len(search(index, "bumper collision windshield", top_k=2)) == 2
+    assert search(index, "submarine", top_k=3) == []
+    assert search(build_index([]), "bumper", top_k=3) == []
+
+
+def test_index_round_trips_through_json(monkeypatch):
+    monkeypatch.setattr(retrieval_service.settings, "RETRIEVAL_CHUNK_WORDS", 5)
+    monkeypatch.setattr(retrieval_service.settings, "RETRIEVAL_CHUNK_OVERLAP", 2)
+    index = build_index(SOURCES)
+    assert len(index["chunks"]) > len(SOURCES)
+    assert search(json.loads(json.dumps(index)), "hail windshield", top_k=2) == search(index, "hail windshield", top_k=2)
+
+
+def test_format_query_with_passages():
+    passages = [{"source": "statement.txt", "text": "hail on the highway"}]
+    message = format_query_with_passages("When did the hail start?", passages)
+    assert "[1] (statement.txt)\nhail on the highway" in message
+    assert message.endswith("Question: When did the hail start?")
+    assert format_query_with_passages("Question only", []) == "Question only"
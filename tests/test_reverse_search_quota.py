@@ -0,0 +1,81 @@
+# tests/test_reverse_search_quota.py
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import DuplicateKeyError
+
+from app.services import enrichment_service
+from app.services.enrichment_service import acquire_quota
+
+NOW = datetime(2024, 5, 1, 12, 30, 15)
+NEXT_MINUTE = datetime(2024, 5, 1, 12, 31)
+NEXT_DAY = datetime(2024, 5, 2)
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return NOW
+
+
+@pytest.fixture
+def quota(monkeypatch):
+    monkeypatch.setattr(enrichment_service, "datetime", FrozenDatetime)
+    monkeypatch.setattr(enrichment_service.settings, "REVERSE_SEARCH_DAILY_QUOTA", 3)
+    monkeypatch.setattr(enrichment_service.settings, "REVERSE_SEARCH_PER_MINUTE_QUOTA", 2)
+    return AsyncMongoMockClient()["veritas_test"]["reverse_search_quota"]
+
+
+def _used(collection):
+    async def read():
+        return {doc["_id"].split(":")[1]: doc["used"] async for doc in collection.find()}
+    return asyncio.run(read())
+
+
+def _acquire(collection, times):
+    async def take():
+        return [await acquire_quota(collection) for _ in range(times)]
+    return asyncio.run(take())
+
+
+def test_searches_are_granted_until_the_minute_budget_is_spent(quota):
+    assert _acquire(quota, 3) == [None, None, NEXT_MINUTE]
+    # The refused search gave back what it took from the daily budget.
+    assert _used(quota) == {"day": 2, "minute": 2}
+
+
+def test_spent_daily_budget_retries_the_next_day(quota, monkeypatch):
+    monkeypatch.setattr(enrichment_service.settings, "REVERSE_SEARCH_DAILY_QUOTA", 1)
+    assert _acquire(quota, 2) == [None, NEXT_DAY]
+    assert _used(quota) == {"day": 1, "minute": 1}
+
+
+def test_a_zero_budget_grants_nothing(quota, monkeypatch):
+    monkeypatch.setattr(enrichment_service.settings, "REVERSE_SEARCH_PER_MINUTE_QUOTA", 0)
+    assert _acquire(quota, 1) == [NEXT_MINUTE]
+    assert _used(quota) == {"day": 0}
+
+
+class RacingCollection:
+    """Loses the first upsert of each window to a concurrent worker that opens it first."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.raced = set()
+
+    async def find_one_and_update(self, query, update, upsert=False):
+        if query["_id"] not in self.raced:
+            self.raced.add(query["_id"])
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return await self.collection.find_one_and_update(query, update, upsert=upsert)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+def test_losing_the_race_to_open_a_window_is_not_a_spent_budget(quota):
+    assert _acquire(RacingCollection(quota), 1) == [None]
+    assert _used(quota) == {"day": 1, "minute": 1}
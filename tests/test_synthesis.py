@@ -0,0 +1,155 @@
+# tests/test_synthesis.py
+
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from app.services import analysis_service
+from app.services.analysis_service import SynthesisScheduler, synthesize_report
+
+REPORT = {"summary": "Photos predate the incident.", "fraud_risk_score": 70, "key_risk_factors": ["EXIF date mismatch"]}
+
+
+# --- SynthesisScheduler ---
+
+def test_scheduler_caps_concurrent_calls():
+    async def scenario():
+        scheduler = SynthesisScheduler(concurrency=2)
+        active, peak = 0, 0
+
+        async def call():
+            nonlocal active, peak
+            async with scheduler.slot():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        return peak, scheduler.active
+
+    assert asyncio.run(scenario()) == (2, 0)
+
+
+def test_scheduler_admits_waiting_claims_highest_priority_first():
+    async def scenario():
+        scheduler = SynthesisScheduler(concurrency=1)
+        admitted = []
+
+        async def call(name, priority):
+            async with scheduler.slot(priority):
+                admitted.append(name)
+                await asyncio.sleep(0)
+
+        async with scheduler.slot():
+            waiting = [asyncio.create_task(call(name, priority)) for name, priority in [("low", 10), ("high", 90), ("mid", 50), ("high-later", 90)]]
+            await asyncio.sleep(0)
+        await asyncio.gather(*waiting)
+        return admitted
+
+    assert asyncio.run(scenario()) == ["high", "high-later", "mid", "low"]
+
+
+def test_scheduler_skips_waiters_cancelled_in_the_queue():
+    async def scenario():
+        scheduler = SynthesisScheduler(concurrency=1)
+        admitted = []
+
+        async def call(name):
+            async with scheduler.slot():
+                admitted.append(name)
+
+        async with scheduler.slot():
+            gone, kept = asyncio.create_task(call("gone")), asyncio.create_task(call("kept"))
+            await asyncio.sleep(0)
+            gone.cancel()
+            await asyncio.sleep(0)
+        await kept
+        return admitted, scheduler.active
+
+    assert asyncio.run(scenario()) == (["kept"], 0)
+
+
+# --- synthesize_report hedging ---
+
+class FakeBedrock:
+    """Stands in for AWSService.invoke_bedrock_model with a scripted delay and reply per model."""
+
+    def __init__(self, replies):
+        self.replies = {model: list(script) for model, script in replies.items()}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, analyzer="synthesis", model_id=None):
+        with self._lock:
+            self.calls.append((model_id, analyzer))
+            delay, reply = self.replies[model_id].pop(0)
+        time.sleep(delay)
+        if isinstance(reply, Exception):
+            raise reply
+        return {"text": reply, "usage": {"model_id": model_id, "analyzer": analyzer}}
+
+
+@pytest.fixture
+def bedrock(monkeypatch):
+    monkeypatch.setattr(analysis_service.settings, "BEDROCK_MODEL_ID", "primary")
+    monkeypatch.setattr(analysis_service.settings, "BEDROCK_FALLBACK_MODEL_IDS", ["backup"])
+    monkeypatch.setattr(analysis_service.settings, "BEDROCK_HEDGE_AFTER_SECONDS", 0.05)
+    monkeypatch.setattr(analysis_service.settings, "BEDROCK_REPAIR_ATTEMPTS", 1)
+
+    def install(replies):
+        fake = FakeBedrock(replies)
+        monkeypatch.setattr(analysis_service.aws_service, "invoke_bedrock_model", fake)
+        return fake
+    return install
+
+
+def _synthesize():
+    usages = []
+    # asyncio.run waits for abandoned calls still running in worker threads, so
+    # every usage record is in by the time it returns.
+    report = asyncio.run(synthesize_report("prompt", usages))
+    return report, usages
+
+
+def test_primary_answering_in_time_is_not_hedged(bedrock):
+    fake = bedrock({"primary": [(0, json.dumps(REPORT))], "backup": []})
+    report, usages = _synthesize()
+    assert report == REPORT
+    assert fake.calls == [("primary", "synthesis")]
+    assert len(usages) == 1
+
+
+def test_slow_primary_is_hedged_and_the_first_valid_report_wins(bedrock):
+    hedged = dict(REPORT, summary="From the backup.")
+    fake = bedrock({"primary": [(0.5, json.dumps(REPORT))], "backup": [(0, json.dumps(hedged))]})
+    report, usages = _synthesize()
+    assert report == hedged
+    assert fake.calls == [("primary", "synthesis"), ("backup", "synthesis_hedge")]
+    # The abandoned primary call is still billed, so its usage is kept.
+    assert sorted(usage["model_id"] for usage in usages) == ["backup", "primary"]
+
+
+def test_failed_primary_falls_back_without_waiting_for_the_hedge_delay(bedrock, monkeypatch):
+    monkeypatch.setattr(analysis_service.settings, "BEDROCK_HEDGE_AFTER_SECONDS", None)
+    fake = bedrock({"primary": [(0, RuntimeError("throttled"))], "backup": [(0, json.dumps(REPORT))]})
+    report, _ = _synthesize()
+    assert report == REPORT
+    assert fake.calls == [("primary", "synthesis"), ("backup", "synthesis_hedge")]
+
+
+def test_malformed_report_is_repaired_on_the_same_model(bedrock):
+    fake = bedrock({"primary": [(0, "Here is my analysis: risk is high."), (0, json.dumps(REPORT))], "backup": []})
+    report, usages = _synthesize()
+    assert report == REPORT
+    assert fake.calls == [("primary", "synthesis"), ("primary", "synthesis_repair")]
+    assert len(usages) == 2
+
+
+def test_synthesis_fails_when_every_model_fails(bedrock):
+    bedrock({"primary": [(0, RuntimeError("throttled"))], "backup": [(0, RuntimeError("model not ready"))]})
+    with pytest.raises(RuntimeError, match="model not ready"):
+        _synthesize()
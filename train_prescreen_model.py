@@ -0,0 +1,148 @@
+# train_prescreen_model.py
+
+"""
+Trains the pre-screening risk model (a logistic regression) from analysed claims.
+
+Each claim analysed since pre-screening was introduced stores its feature vector
+under `prescreen.features`. The label comes from the full review: a claim is a
+positive if its Bedrock synthesis scored it at or above --label-threshold.
+Claims that skipped synthesis are left out, so the model is never trained on
+its own output.
+
+Usage:
+    python train_prescreen_model.py --output app/services/prescreen_model.json
+    python train_prescreen_model.py --input labelled.jsonl --output model.json
+      (JSONL lines: {"features": {...}, "label": 0 or 1})
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+FEATURES = ["reverse_search_hits", "max_photo_age_days", "photos_after_claim", "device_count", "exif_missing_share", "forensic_alert_count", "damage_label_share", "entity_link_count", "image_count"]
+
+
+def load_from_mongo(label_threshold: int) -> List[Tuple[Dict[str, float], int]]:
+    from app.core.resources import registry
+
+    claims = registry.sync_database().claims.find(
+        {"prescreen.features": {"$exists": True}, "stage_timings.synthesis": {"$exists": True}},
+        {"prescreen.features": 1, "fraud_risk_score": 1},
+    )
+    samples = []
+    for claim in claims:
+        score = claim.get("fraud_risk_score")
+        if score is None or score < 0:
+            continue  # synthesis failed; no usable label
+        samples.append((claim["prescreen"]["features"], int(score >= label_threshold)))
+    return samples
+
+
+def load_from_file(path: str) -> List[Tuple[Dict[str, float], int]]:
+    with open(path) as f:
+        return [(row["features"], int(row["label"])) for row in (json.loads(line) for line in f if line.strip())]
+
+
+def standardize(rows: List[List[float]]) -> Tuple[List[float], List[float]]:
+    n = len(rows)
+    means = [sum(col) / n for col in zip(*rows)]
+    scales = [math.sqrt(sum((x - m) ** 2 for x in col) / n) or 1.0 for col, m in zip(zip(*rows), means)]
+    return means, scales
+
+
+def train(samples: List[Tuple[Dict[str, float], int]], epochs: int, learning_rate: float, l2: float, seed: int) -> Dict:
+    raw = [[float(features.get(name, 0.0)) for name in FEATURES] for features, _ in samples]
+    labels = [label for _, label in samples]
+    means, scales = standardize(raw)
+    rows = [[(x - m) / s for x, m, s in zip(row, means, scales)] for row in raw]
+
+    # Re-weight classes so a rare positive class still moves the decision boundary.
+    positives = sum(labels) or 1
+    negatives = (len(labels) - sum(labels)) or 1
+    class_weight = {1: len(labels) / (2 * positives), 0: len(labels) / (2 * negatives)}
+
+    weights, intercept = [0.0] * len(FEATURES), 0.0
+    order = list(range(len(rows)))
+    rng = random.Random(seed)
+    for _ in range(epochs):
+        rng.shuffle(order)
+        for i in order:
+            z = intercept + sum(w * x for w, x in zip(weights, rows[i]))
+            p = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+            error = (p - labels[i]) * class_weight[labels[i]]
+            weights = [w - learning_rate * (error * x + l2 * w) for w, x in zip(weights, rows[i])]
+            intercept -= learning_rate * error
+
+    return {
+        "version": datetime.utcnow().strftime("trained-%Y%m%d%H%M%S"),
+        "trained_at": datetime.utcnow().isoformat(),
+        "samples": len(samples),
+        "features": FEATURES,
+        "means": [round(m, 6) for m in means],
+        "scales": [round(s, 6) for s in scales],
+        "coefficients": [round(w, 6) for w in weights],
+        "intercept": round(intercept, 6),
+    }
+
+
+def evaluate(model: Dict, samples: List[Tuple[Dict[str, float], int]], threshold: float = 0.5) -> Dict[str, float]:
+    from app.services.prescreen_service import model_probability
+
+    tp = fp = fn = tn = 0
+    for features, label in samples:
+        predicted = model_probability(model, features) >= threshold
+        tp += predicted and label
+        fp += predicted and not label
+        fn += (not predicted) and label
+        tn += (not predicted) and not label
+    return {
+        "accuracy": round((tp + tn) / len(samples), 3),
+        "precision": round(tp / (tp + fp), 3) if tp + fp else 0.0,
+        "recall": round(tp / (tp + fn), 3) if tp + fn else 0.0,
+    }
+
+
+def holdout_share(value: str) -> float:
+    share = float(value)
+    if not 0 <= share < 1:
+        raise argparse.ArgumentTypeError("must be at least 0 and below 1")
+    return share
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Train the claim pre-screening model.")
+    parser.add_argument("--input", help="Labelled JSONL instead of reading claims from MongoDB.")
+    parser.add_argument("--output", required=True, help="Where to write the model JSON (see PRESCREEN_MODEL_PATH).")
+    parser.add_argument("--label-threshold", type=int, default=60, help="Synthesis score counted as a positive.")
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--learning-rate", type=float, default=0.01)
+    parser.add_argument("--l2", type=float, default=0.001)
+    parser.add_argument("--holdout", type=holdout_share, default=0.2, help="Share of samples kept back for evaluation (0 skips evaluation).")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    samples = load_from_file(args.input) if args.input else load_from_mongo(args.label_threshold)
+    if len(samples) < 20 or len({label for _, label in samples}) < 2:
+        print(f"Not enough labelled claims to train ({len(samples)}, both classes needed).", file=sys.stderr)
+        return 1
+
+    random.Random(args.seed).shuffle(samples)
+    split = int(len(samples) * (1 - args.holdout))
+    model = train(samples[:split], args.epochs, args.learning_rate, args.l2, args.seed)
+    if split < len(samples):
+        print(f"Trained on {split} claims; holdout of {len(samples) - split}: {evaluate(model, samples[split:])}")
+    else:
+        print(f"Trained on {split} claims; no holdout left, so the model was not evaluated.")
+
+    with open(args.output, "w") as f:
+        json.dump(model, f, indent=2)
+    print(f"Model {model['version']} written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
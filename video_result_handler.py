@@ -2,30 +2,22 @@
 
 import os
 import json
-from pymongo import MongoClient
 from datetime import datetime
-import boto3
 import asyncio
 
 # NOTE: For deployment, you would create a Lambda Layer or package the 'app' directory
 # into your deployment zip. This code assumes the service files are available.
-from app.services.aws_service import AWSService
+from app.core.resources import registry
+from app.services.aws_service import aws_service
 from app.services.analysis_service import analyze_claim_bundle
+from app.services.blob_service import offload_fields
 
 # --- Initialize outside the handler for performance (re-used across invocations) ---
-MONGO_URI = os.environ.get("MONGO_CONNECTION_STRING")
-MONGO_DB = os.environ.get("MONGO_DB_NAME")
-
-try:
-    client = MongoClient(MONGO_URI)
-    db = client[MONGO_DB]
-    claims_collection = db.claims
-    documents_collection = db.documents
-except Exception as e:
-    print(f"FATAL: Could not connect to MongoDB: {e}")
-    # This will cause the Lambda to fail on initialization, which is what we want.
-
-aws_service = AWSService()
+# The registry's sync client and shared AWS clients keep their pools open between
+# invocations of a warm container.
+db = registry.sync_database()
+claims_collection = db.claims
+documents_collection = db.documents
 
 def handler(event, context):
     """
@@ -49,8 +41,7 @@ def handler(event, context):
     # 2. Process the result based on whether the job succeeded or failed
     if status == 'SUCCEEDED':
         # Get the results from Rekognition
-        rek_client = boto3.client('rekognition', region_name=os.environ.get("AWS_REGION"))
-        response = rek_client.get_label_detection(JobId=job_id)
+        response = aws_service.rekognition_client.get_label_detection(JobId=job_id)
         
         detected_labels = []
         for label in response.get('Labels', []):
@@ -65,13 +56,13 @@ def handler(event, context):
         # Update the document in MongoDB with the results
         documents_collection.update_one(
             {"_id": document['_id']},
-            {"$set": {"video_analysis_results": video_results, "analysis_status": "completed"}}
+            {"$set": offload_fields(document["claim_id"], {"video_analysis_results": video_results, "analysis_status": "completed"})}
         )
     else:
         # If the job failed, update the status accordingly
         documents_collection.update_one(
             {"_id": document['_id']},
-            {"$set": {"analysis_status": "failed", "video_analysis_results": {"error": "Rekognition job failed."}}}
+            {"$set": offload_fields(document["claim_id"], {"analysis_status": "failed", "video_analysis_results": {"error": "Rekognition job failed."}})}
         )
 
     print(f"Successfully processed video result for {s3_key}.")